@@ -0,0 +1,322 @@
+"""Bot-versus-Edax agreement and strength harness.
+
+Replays a corpus of positions through one of our engines and through Edax,
+both in parallel, instead of playing one game at a time:
+
+1. A pool of Edax processes searches every position at --reference-level.
+   Its move and score are taken as the truth.
+2. A process pool searches every position with our engine, once per
+   --budget (seconds per move).
+3. Edax at the reference level scores each position reached by a move that
+   differs from its own. The score loss of a move is the reference score
+   minus the score of that move.
+4. The same is done for Edax at --edax-level. The budget at which our mean
+   loss matches that level's is interpolated between the measured budgets,
+   one strength-versus-compute number to optimize against.
+
+Agreement and mean loss are reported per empties bucket and budget. Scores
+are in Edax's units, discs at the end of the game.
+
+    python agreement.py --positions 500 --budget 0.1 --budget 0.5 --budget 2 \\
+        --reference-level 16 --edax-level 8 -e alphabeta:depth=60
+    python agreement.py --edax-path ./mock_edax.py --reference-level 4 --edax-level 2 \\
+        --positions 40 --budget 0.05 --budget 0.2      # without the real binary
+"""
+import argparse
+import json
+import math
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from multiprocessing.util import Finalize
+from typing import Dict, List, Optional, Tuple
+
+import bitboard
+import edax
+import engines
+import main4
+import tournament
+
+Move = Optional[Tuple[int, int]]
+# (fen, color) as in tournament openings
+Corpus = List[Tuple[str, int]]
+
+# Engines are built once per worker process and reused across positions
+_engines: Dict[str, object] = {}
+
+
+def random_corpus(count: int, seed: int, min_plies: int = 4, max_plies: int = 54) -> Corpus:
+    """Positions after a random number of random plies, so every stage of the game turns up."""
+    rng = random.Random(seed)
+    corpus = []
+    while len(corpus) < count:
+        black, white = bitboard.to_bitboards(main4.create_board())
+        player, opponent, color = black, white, 1
+        for _ in range(rng.randint(min_plies, max_plies)):
+            squares = list(bitboard.iter_bits(bitboard.legal_moves(player, opponent)))
+            if not squares:
+                if not bitboard.legal_moves(opponent, player):
+                    break
+                squares = [None]
+            square = rng.choice(squares)
+            if square is not None:
+                flipped = bitboard.flips(player, opponent, square)
+                player, opponent = player | flipped | (1 << square), opponent & ~flipped
+            player, opponent, color = opponent, player, -color
+        if not bitboard.legal_moves(player, opponent):
+            continue
+        black, white = (player, opponent) if color == 1 else (opponent, player)
+        corpus.append((edax.arr_to_fen(bitboard.from_bitboards(black, white)), color))
+    return corpus
+
+
+def _board_after(fen: str, color: int, played: Tuple[int, int]) -> str:
+    black, white = bitboard.to_bitboards(edax.fen_to_arr(fen))
+    player, opponent = (black, white) if color == 1 else (white, black)
+    square = played[0] * 8 + played[1]
+    flipped = bitboard.flips(player, opponent, square)
+    player, opponent = player | flipped | (1 << square), opponent & ~flipped
+    black, white = (player, opponent) if color == 1 else (opponent, player)
+    return edax.arr_to_fen(bitboard.from_bitboards(black, white))
+
+
+class EdaxPool:
+    """Several Edax processes, each streaming its share of a batch of positions."""
+
+    def __init__(self, path: str, processes: int):
+        self.processes = [edax.start_edax(path) for _ in range(processes)]
+
+    def search(self, positions: Corpus, level: int) -> List[edax.SearchResult]:
+        shares = [list(range(index, len(positions), len(self.processes)))
+                  for index in range(len(self.processes))]
+
+        def run(process, share: List[int]) -> List[edax.SearchResult]:
+            boards = ((edax.fen_to_arr(positions[i][0]), positions[i][1]) for i in share)
+            return [result for _, _, result in edax.analyze_positions(boards, process, level=level)]
+
+        results: List[Optional[edax.SearchResult]] = [None] * len(positions)
+        with ThreadPoolExecutor(len(self.processes)) as threads:
+            for share, share_results in zip(shares, threads.map(run, self.processes, shares)):
+                for i, result in zip(share, share_results):
+                    results[i] = result
+        return results
+
+    def close(self) -> None:
+        for process in self.processes:
+            edax.close_edax(process)
+
+    def __enter__(self) -> 'EdaxPool':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def move_values(pool: EdaxPool, corpus: Corpus, moves: List[Move], level: int,
+                known: Dict[Tuple[str, int, Move], Optional[float]]) -> List[Optional[float]]:
+    """Reference-level score of playing moves[i] in corpus[i], from the mover's side.
+
+    `known` caches (fen, color, move) scores across calls; the reference
+    search's own move is put there first. A score is None when Edax answered
+    from its opening book, which prints no search lines.
+    """
+    wanted: Dict[Tuple[str, int, Move], Tuple[str, int]] = {}
+    for (fen, color), played in zip(corpus, moves):
+        key = (fen, color, played)
+        if key in known or key in wanted:
+            continue
+        child = _board_after(fen, color, played)
+        black, white = bitboard.to_bitboards(edax.fen_to_arr(child))
+        mover, other = (black, white) if color == 1 else (white, black)
+        if bitboard.legal_moves(other, mover):
+            wanted[key] = (child, -color)
+        elif bitboard.legal_moves(mover, other):
+            # The opponent passes, so the mover moves again
+            wanted[key] = (child, color)
+        else:
+            # Game over, empty squares go to the winner as Edax scores it
+            discs = bin(mover).count('1') - bin(other).count('1')
+            empties = 64 - bin(mover | other).count('1')
+            known[key] = discs + empties if discs > 0 else discs - empties if discs < 0 else 0
+    keys = list(wanted)
+    for key, result in zip(keys, pool.search([wanted[key] for key in keys], level)):
+        # The reply's score is from the side to move after it, the opponent unless it passed
+        if result.score is None:
+            known[key] = None
+        else:
+            known[key] = -result.score if wanted[key][1] != key[1] else result.score
+    return [known[(fen, color, played)] for (fen, color), played in zip(corpus, moves)]
+
+
+def _close_engines() -> None:
+    for engine in _engines.values():
+        if hasattr(engine, 'close'):
+            engine.close()
+
+
+def _init_worker() -> None:
+    # Pool workers leave through multiprocessing's exit path, not atexit. Ahead of the
+    # queues' own finalizers (priority 10), which an engine's pool needs to shut down
+    Finalize(None, _close_engines, exitpriority=20)
+
+
+def _engine_worker(args) -> Tuple[Move, Optional[int]]:
+    spec, fen, color, budget = args
+    if spec not in _engines:
+        _engines[spec] = engines.create(spec)
+    result = _engines[spec].search(engines.Position(edax.fen_to_arr(fen), color),
+                                   engines.Limits(time=budget))
+    return result.move, result.depth
+
+
+@dataclass
+class Bucket:
+    positions: int = 0
+    agreed: int = 0
+    loss: float = 0.0
+
+    @property
+    def agreement(self) -> float:
+        return self.agreed / self.positions if self.positions else 0.0
+
+    @property
+    def mean_loss(self) -> float:
+        return self.loss / self.positions if self.positions else 0.0
+
+
+@dataclass
+class Run:
+    """One player over the corpus: our engine at a budget, or an Edax level."""
+    name: str
+    budget: Optional[float]
+    moves: List[Move] = field(default_factory=list)
+    buckets: Dict[str, Bucket] = field(default_factory=dict)
+    # Positions left out because Edax gave no score for them
+    unscored: int = 0
+
+    @property
+    def total(self) -> Bucket:
+        total = Bucket()
+        for bucket in self.buckets.values():
+            total.positions += bucket.positions
+            total.agreed += bucket.agreed
+            total.loss += bucket.loss
+        return total
+
+
+def bucket_name(empties: int, width: int) -> str:
+    low = empties // width * width
+    return f"{low}-{low + width - 1}"
+
+
+def score_run(run: Run, corpus: Corpus, reference: List[edax.SearchResult],
+              values: List[Optional[float]], width: int) -> None:
+    for (fen, _), result, played, value in zip(corpus, reference, run.moves, values):
+        if result.score is None or value is None:
+            run.unscored += 1
+            continue
+        # A shallower reference can rate another move above its own; that is not a gain
+        loss = max(0.0, result.score - value)
+        bucket = run.buckets.setdefault(bucket_name(fen.count('.'), width), Bucket())
+        bucket.positions += 1
+        bucket.agreed += played == result.bot_move
+        bucket.loss += loss
+
+
+def matching_budget(runs: List[Run], target: float) -> Optional[float]:
+    """Seconds per move at which the mean loss falls to target, log-interpolated."""
+    points = sorted((run.budget, run.total.mean_loss) for run in runs)
+    previous = None
+    for budget, loss in points:
+        if loss <= target:
+            if previous is None or previous[1] == loss:
+                return budget
+            fraction = (previous[1] - target) / (previous[1] - loss)
+            return math.exp(math.log(previous[0]) + fraction * (math.log(budget) - math.log(previous[0])))
+        previous = budget, loss
+    return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Move agreement and score loss against Edax")
+    parser.add_argument('-e', '--engine', default='alphabeta:depth=60',
+                        help="engine spec for engines.create(), searched with a time limit")
+    parser.add_argument('--budget', type=float, action='append',
+                        help="seconds per move for our engine, repeat for each; default 0.1, 0.3, 1")
+    parser.add_argument('--positions', default='200',
+                        help="number of random positions, or a file of 'fen X|O' lines")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--reference-level', type=int, default=16, help="Edax level taken as the truth")
+    parser.add_argument('--edax-level', type=int, default=8, help="Edax level to match a budget to")
+    parser.add_argument('--edax-path', default='./edax')
+    parser.add_argument('--edax-processes', type=int, default=os.cpu_count())
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                        help="processes searching with our engine")
+    parser.add_argument('--bucket', type=int, default=10, help="empties per bucket")
+    parser.add_argument('--json', help="write the full report here")
+    args = parser.parse_args()
+
+    if os.path.exists(args.positions):
+        corpus = tournament.load_openings(args.positions)
+    else:
+        corpus = random_corpus(int(args.positions), args.seed)
+    budgets = sorted(args.budget or [0.1, 0.3, 1.0])
+
+    with EdaxPool(args.edax_path, args.edax_processes) as pool:
+        reference = pool.search(corpus, args.reference_level)
+        known = {(fen, color, result.bot_move): result.score
+                 for (fen, color), result in zip(corpus, reference)}
+
+        runs = []
+        with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker) as executor:
+            for budget in budgets:
+                run = Run(f"{args.engine} {budget}s", budget)
+                run.moves = [played for played, _ in executor.map(
+                    _engine_worker, [(args.engine, fen, color, budget) for fen, color in corpus])]
+                runs.append(run)
+        edax_run = Run(f"edax level {args.edax_level}", None)
+        edax_run.moves = [result.bot_move for result in pool.search(corpus, args.edax_level)]
+
+        for run in runs + [edax_run]:
+            score_run(run, corpus, reference,
+                      move_values(pool, corpus, run.moves, args.reference_level, known), args.bucket)
+
+    names = sorted({name for run in runs + [edax_run] for name in run.buckets},
+                   key=lambda name: -int(name.split('-')[0]))
+    print(f"{len(corpus)} positions, reference Edax level {args.reference_level}")
+    print(f"{'empties':<8}" + ''.join(f"{run.name:>34}" for run in runs + [edax_run]))
+    for name in names + ['all']:
+        cells = []
+        for run in runs + [edax_run]:
+            bucket = run.total if name == 'all' else run.buckets.get(name, Bucket())
+            cells.append(f"{bucket.agreement:>10.1%} agree {bucket.mean_loss:>7.2f} loss"
+                         f" {bucket.positions:>5}")
+        print(f"{name:<8}" + ''.join(f"{cell:>34}" for cell in cells))
+    for run in runs + [edax_run]:
+        if run.unscored:
+            print(f"{run.name}: {run.unscored} positions unscored, Edax played a book move")
+
+    target = edax_run.total.mean_loss
+    budget = matching_budget(runs, target)
+    if budget is None:
+        print(f"no budget up to {budgets[-1]}s matches Edax level {args.edax_level} "
+              f"(mean loss {target:.2f})")
+    else:
+        print(f"{args.engine} matches Edax level {args.edax_level} (mean loss {target:.2f}) "
+              f"at {budget:.3f}s per move")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'engine': args.engine, 'reference_level': args.reference_level,
+                       'edax_level': args.edax_level, 'positions': len(corpus),
+                       'matching_budget': budget,
+                       'runs': [{'name': run.name, 'budget': run.budget,
+                                 'buckets': {name: asdict(bucket) for name, bucket in run.buckets.items()},
+                                 'agreement': run.total.agreement, 'mean_loss': run.total.mean_loss,
+                                 'unscored': run.unscored}
+                                for run in runs + [edax_run]]}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
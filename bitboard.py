@@ -0,0 +1,193 @@
+import struct
+from typing import List, Tuple
+
+import tables
+
+# Square (row, col) maps to bit row * 8 + col
+_PACKED = struct.Struct('<QQ')
+
+
+def to_bitboards(board: List[List[int]]) -> Tuple[int, int]:
+    black = white = 0
+    for row in range(8):
+        for col in range(8):
+            cell = board[row][col]
+            if cell == 1:
+                black |= 1 << (row * 8 + col)
+            elif cell == -1:
+                white |= 1 << (row * 8 + col)
+    return black, white
+
+
+def from_bitboards(black: int, white: int) -> List[List[int]]:
+    return [[1 if black >> (row * 8 + col) & 1 else -1 if white >> (row * 8 + col) & 1 else 0
+             for col in range(8)] for row in range(8)]
+
+
+def pack(board: List[List[int]]) -> bytes:
+    """16 bytes: black then white bitboard, little endian."""
+    return _PACKED.pack(*to_bitboards(board))
+
+
+def unpack(data: bytes) -> List[List[int]]:
+    return from_bitboards(*_PACKED.unpack(data))
+
+
+FULL = 0xFFFFFFFFFFFFFFFF
+NOT_A_FILE = 0xFEFEFEFEFEFEFEFE  # col 0 cleared
+NOT_H_FILE = 0x7F7F7F7F7F7F7F7F  # col 7 cleared
+
+
+def _east(x): return (x << 1) & NOT_A_FILE & FULL
+def _west(x): return (x >> 1) & NOT_H_FILE
+def _south(x): return (x << 8) & FULL
+def _north(x): return x >> 8
+def _south_east(x): return (x << 9) & NOT_A_FILE & FULL
+def _south_west(x): return (x << 7) & NOT_H_FILE & FULL
+def _north_east(x): return (x >> 7) & NOT_A_FILE
+def _north_west(x): return (x >> 9) & NOT_H_FILE
+
+
+SHIFTS = (_east, _west, _south, _north, _south_east, _south_west, _north_east, _north_west)
+
+_tables = tables.load()
+# Squares beyond square s in SHIFTS[d]'s direction are _RAYS[s * 8 + d]
+_RAYS = tuple(_tables['rays'])
+_lines = _tables['lines']
+_images = _tables['symmetry_squares']
+
+
+def legal_moves(player: int, opponent: int) -> int:
+    """Bitboard of the squares where `player` may move."""
+    empty = ~(player | opponent) & FULL
+    moves = 0
+    for shift in SHIFTS:
+        # Runs of opponent discs are at most six long
+        run = shift(player) & opponent
+        for _ in range(5):
+            run |= shift(run) & opponent
+        moves |= shift(run) & empty
+    return moves
+
+
+def flips(player: int, opponent: int, square: int) -> int:
+    flipped = 0
+    first = square * 8
+    not_opponent = ~opponent
+    # East, south and both southern diagonals run towards higher bits
+    for direction in (0, 2, 4, 5):
+        ray = _RAYS[first + direction]
+        stop = ray & not_opponent
+        stop &= -stop
+        if stop & player:
+            flipped |= ray & (stop - 1)
+    for direction in (1, 3, 6, 7):
+        ray = _RAYS[first + direction]
+        stop = ray & not_opponent
+        if stop:
+            stop = 1 << (stop.bit_length() - 1)
+            if stop & player:
+                flipped |= ray & -(stop << 1)
+    return flipped
+
+
+def iter_bits(bits: int):
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+
+def flip_vertical(x: int) -> int:
+    """Row r goes to row 7 - r."""
+    return int.from_bytes(x.to_bytes(8, 'little'), 'big')
+
+
+def mirror_horizontal(x: int) -> int:
+    """Column c goes to column 7 - c."""
+    x = ((x >> 1) & 0x5555555555555555) | ((x & 0x5555555555555555) << 1)
+    x = ((x >> 2) & 0x3333333333333333) | ((x & 0x3333333333333333) << 2)
+    return ((x >> 4) & 0x0F0F0F0F0F0F0F0F) | ((x & 0x0F0F0F0F0F0F0F0F) << 4)
+
+
+def transpose(x: int) -> int:
+    """(row, col) goes to (col, row)."""
+    t = 0x0F0F0F0F00000000 & (x ^ (x << 28))
+    x ^= t ^ (t >> 28)
+    t = 0x3333000033330000 & (x ^ (x << 14))
+    x ^= t ^ (t >> 14)
+    t = 0x5500550055005500 & (x ^ (x << 7))
+    return x ^ t ^ (t >> 7)
+
+
+def _rotate_half(x): return mirror_horizontal(flip_vertical(x))
+
+
+# The eight symmetries of the board, the identity first
+SYMMETRIES = (
+    lambda x: x, flip_vertical, mirror_horizontal, _rotate_half,
+    transpose, lambda x: transpose(flip_vertical(x)), lambda x: transpose(mirror_horizontal(x)),
+    lambda x: transpose(_rotate_half(x)),
+)
+# Square s maps to SYMMETRY_SQUARES[i][s] under SYMMETRIES[i], and back through SYMMETRY_INVERSE
+SYMMETRY_SQUARES = tuple(tuple(_images[index * 64:index * 64 + 64]) for index in range(8))
+SYMMETRY_INVERSE = tuple(tuple(sorted(range(64), key=squares.__getitem__))
+                         for squares in SYMMETRY_SQUARES)
+
+
+def canonical(player: int, opponent: int) -> Tuple[int, int, int]:
+    """The smallest symmetric image of a position and the index of its symmetry."""
+    return min((symmetry(player), symmetry(opponent), index)
+               for index, symmetry in enumerate(SYMMETRIES))
+
+
+# Rows, columns, and the diagonals running down-right and down-left
+LINES = (tuple(_lines[:8]), tuple(_lines[8:16]), tuple(_lines[16:31]), tuple(_lines[31:]))
+EDGE = 0xFF000000000000FF | 0x8181818181818181
+# Per axis, the squares where one side of the line is the board's edge
+_AXIS_EDGES = (0x8181818181818181, 0xFF000000000000FF, EDGE, EDGE)
+_AXIS_SHIFTS = ((_east, _west), (_south, _north), (_south_east, _north_west), (_south_west, _north_east))
+
+
+def neighbours(x: int) -> int:
+    """Squares next to any square of x, in any of the eight directions."""
+    result = 0
+    for shift in SHIFTS:
+        result |= shift(x)
+    return result
+
+
+def stable_discs(player: int, opponent: int) -> int:
+    """Discs of `player` that can never be flipped.
+
+    A disc is stable when, along each of its four lines, the line is full, the
+    disc is on the board's edge, or its neighbour on that line is a stable disc
+    of the same colour. Growing the set from nothing until it stops changing
+    finds every corner-anchored block; it misses a few rarer stable discs.
+    """
+    occupied = player | opponent
+    protected = []
+    for lines, edge in zip(LINES, _AXIS_EDGES):
+        full = 0
+        for mask in lines:
+            if occupied & mask == mask:
+                full |= mask
+        protected.append(full | edge)
+    stable = 0
+    while True:
+        grown = player
+        for axis, (forward, back) in zip(protected, _AXIS_SHIFTS):
+            grown &= axis | forward(stable) | back(stable)
+        if grown == stable:
+            return stable
+        stable = grown
+
+
+def frontier(player: int, opponent: int) -> int:
+    """Discs of `player` next to an empty square."""
+    return player & neighbours(~(player | opponent) & FULL)
+
+
+def potential_mobility(player: int, opponent: int) -> int:
+    """Empty squares next to an opponent disc, where `player` may later get a move."""
+    return neighbours(opponent) & ~(player | opponent) & FULL
@@ -94,7 +94,7 @@ def look_ahead(board_state, search_depth, alpha, beta, is_maximizing, player_col
             future_board = [row[:] for row in board_state]
             make_move(future_board, row, col, player_color)
             
-            score = look_ahead(future_board, search_depth-1, alpha, beta, Fal se, player_color)
+            score = look_ahead(future_board, search_depth-1, alpha, beta, False, player_color)
             best_score = max(best_score, score)
             alpha = max(alpha, score)
             if beta <= alpha:
@@ -193,7 +193,8 @@ def play_game(bot1, bot2, verbose=True):
         
         if move_result is None:  # No valid moves for the current player
             consecutive_passes += 1
-            print(f"{'Black' if current_player == 1 else 'White'} passes.")
+            if verbose:
+                print(f"{'Black' if current_player == 1 else 'White'} passes.")
         else:
             row, col = move_result
             make_move(board, row, col, current_player)
@@ -202,7 +203,8 @@ def play_game(bot1, bot2, verbose=True):
                 print(f"{'Black' if current_player == 1 else 'White'} moves to {row},{col}")
         
         current_player = -current_player  # Switch player
-        print()
+        if verbose:
+            print()
     
     # Final scoring
     black_count = sum(row.count(1) for row in board)
@@ -0,0 +1,379 @@
+"""Coordinator and workers that spread search and perft over several machines.
+
+A Coordinator is an Executor, so anything that fans work out through one,
+main4.search_root's root split included, runs across machines unchanged:
+
+    with Coordinator(('0.0.0.0', 5800), authkey=secret) as coordinator:
+        best_move, score = main4.search_root(board, 1, 8, executor=coordinator)
+
+Work units are (function, args) pairs queued in the coordinator and served by
+a multiprocessing.managers server over TCP. Functions travel by name, so
+every worker needs the same checkout of this repository. Workers lease a few
+units at a time and renew their leases from a heartbeat thread while they
+work. A unit whose lease runs out (the worker died, hung or lost the network)
+goes back to the front of the queue for another worker. A late result from
+the first worker is ignored.
+
+Units are unpickled, and so run, by whoever holds the authkey, so every
+coordinator has a secret one: OTHELLO_AUTHKEY (or --authkey) when set, else a
+random key that the coordinator prints for its workers.
+
+    export OTHELLO_AUTHKEY=$(python -c 'import secrets; print(secrets.token_hex(16))')
+    python distributed.py perft --listen 0.0.0.0:5800 --depth 11 --split 4
+    python distributed.py search --listen 0.0.0.0:5800 --positions 50 --depth 7
+    python distributed.py worker --connect coordinator-host:5800 --processes 8   # same key
+
+Everything runs on one machine too; --local-workers starts the workers:
+
+    python distributed.py perft --local-workers 4 --depth 8
+    python distributed.py search --local-workers 4 --positions 8 --depth 5
+"""
+import argparse
+import itertools
+import os
+import secrets
+import socket
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from multiprocessing.managers import BaseManager
+from typing import Callable, Dict, List, Optional, Tuple
+
+import bitboard
+
+Address = Tuple[str, int]
+
+
+def default_authkey() -> Optional[bytes]:
+    key = os.environ.get('OTHELLO_AUTHKEY')
+    return key.encode() if key else None
+
+
+class WorkQueue:
+    """The coordinator's units, leases and futures. Workers reach it through a proxy."""
+
+    def __init__(self, lease_time: float):
+        self._lease_time = lease_time
+        self._changed = threading.Condition()
+        self._ids = itertools.count()
+        self._units: Dict[int, Tuple[Callable, tuple, dict, Future]] = {}
+        self._pending: deque = deque()
+        # unit id -> (worker, expiry)
+        self._leases: Dict[int, Tuple[str, float]] = {}
+        self._closed = False
+        self.reissued = 0
+        self.completed: Counter = Counter()
+
+    def add(self, fn: Callable, args: tuple, kwargs: dict) -> Future:
+        future: Future = Future()
+        with self._changed:
+            if self._closed:
+                raise RuntimeError("coordinator is closed")
+            unit_id = next(self._ids)
+            self._units[unit_id] = (fn, args, kwargs, future)
+            self._pending.append(unit_id)
+            self._changed.notify_all()
+        return future
+
+    def _expire(self, now: float) -> None:
+        for unit_id, (_, expiry) in list(self._leases.items()):
+            if expiry < now:
+                del self._leases[unit_id]
+                self._pending.appendleft(unit_id)
+                self.reissued += 1
+
+    def lease(self, worker: str, count: int = 1, wait: float = 1.0) -> List[Tuple[int, Callable, tuple, dict]]:
+        """Up to count units for worker; empty after waiting `wait` seconds for work."""
+        deadline = time.monotonic() + wait
+        with self._changed:
+            while True:
+                now = time.monotonic()
+                self._expire(now)
+                leased = []
+                while self._pending and len(leased) < count:
+                    unit_id = self._pending.popleft()
+                    fn, args, kwargs, future = self._units[unit_id]
+                    # Reissued units are already running; cancelled ones are dropped
+                    if future.running() or future.set_running_or_notify_cancel():
+                        self._leases[unit_id] = (worker, now + self._lease_time)
+                        leased.append((unit_id, fn, args, kwargs))
+                    else:
+                        del self._units[unit_id]
+                if leased or self._closed or now >= deadline:
+                    return leased
+                # Wake up in time to reissue the next lease that runs out
+                expiries = [expiry for _, expiry in self._leases.values()]
+                self._changed.wait(min([deadline] + expiries) - now)
+
+    def renew(self, worker: str) -> None:
+        with self._changed:
+            expiry = time.monotonic() + self._lease_time
+            for unit_id, (holder, _) in self._leases.items():
+                if holder == worker:
+                    self._leases[unit_id] = (worker, expiry)
+
+    def complete(self, worker: str, results: List[Tuple[int, bool, object]]) -> None:
+        """(unit id, succeeded, result or exception) for each finished unit."""
+        with self._changed:
+            for unit_id, succeeded, value in results:
+                if unit_id not in self._units:
+                    continue
+                _, _, _, future = self._units.pop(unit_id)
+                self._leases.pop(unit_id, None)
+                if unit_id in self._pending:
+                    self._pending.remove(unit_id)
+                self.completed[worker] += 1
+                if succeeded:
+                    future.set_result(value)
+                else:
+                    future.set_exception(value)
+            self._changed.notify_all()
+
+    def settings(self) -> dict:
+        return {'lease_time': self._lease_time}
+
+    def closed(self) -> bool:
+        return self._closed
+
+    def close(self, cancel: bool = False) -> None:
+        with self._changed:
+            self._closed = True
+            if cancel:
+                # Units not yet leased are cancelled. Leased and reissued ones are running
+                # and can't be, and no worker will get to report them, so they fail instead.
+                for _, _, _, future in self._units.values():
+                    if future.cancel():
+                        # Wakes anyone in wait() or as_completed() on it
+                        future.set_running_or_notify_cancel()
+                    else:
+                        future.set_exception(RuntimeError("coordinator closed before the unit finished"))
+                self._units.clear()
+                self._leases.clear()
+                self._pending.clear()
+            self._changed.notify_all()
+
+
+class _Client(BaseManager):
+    pass
+
+
+_Client.register('work_queue')
+
+
+class Coordinator(Executor):
+    def __init__(self, address: Address = ('127.0.0.1', 0), authkey: Optional[bytes] = None,
+                 lease_time: float = 30.0):
+        # Never a well-known key: whoever has it can run any code on the workers
+        self.authkey = authkey or default_authkey() or secrets.token_hex(16).encode()
+        self.queue = WorkQueue(lease_time)
+
+        class Server(BaseManager):
+            pass
+        Server.register('work_queue', callable=lambda: self.queue)
+        self.server = Server(address, self.authkey).get_server()
+        # The real port when port 0 asked for any free one
+        self.address: Address = self.server.address
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        return self.queue.add(fn, args, kwargs)
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False) -> None:
+        self.queue.close(cancel_futures)
+        if wait:
+            # Give waiting workers their last lease() reply, telling them to stop
+            time.sleep(0.1)
+        self.server.stop_event.set()
+
+
+def _heartbeat(queue, worker: str, interval: float, stop: threading.Event) -> None:
+    while not stop.wait(interval):
+        try:
+            queue.renew(worker)
+        except (OSError, EOFError):
+            return
+
+
+def run_worker(address: Address, authkey: Optional[bytes] = None, batch: int = 1,
+               connect_timeout: float = 30.0) -> int:
+    """Serves a coordinator until it closes or goes away; returns the units done."""
+    authkey = authkey or default_authkey()
+    if authkey is None:
+        raise ValueError("no authkey, pass the coordinator's or set OTHELLO_AUTHKEY")
+    client = _Client(address, authkey)
+    give_up = time.monotonic() + connect_timeout
+    while True:
+        try:
+            client.connect()
+            break
+        except OSError:
+            # The coordinator may not be up yet
+            if time.monotonic() > give_up:
+                raise
+            time.sleep(0.5)
+    queue = client.work_queue()
+    worker = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+    stop = threading.Event()
+    threading.Thread(target=_heartbeat, args=(queue, worker, queue.settings()['lease_time'] / 3, stop),
+                     daemon=True).start()
+    done = 0
+    try:
+        while True:
+            units = queue.lease(worker, batch)
+            if not units:
+                if queue.closed():
+                    return done
+                continue
+            results = []
+            for unit_id, fn, args, kwargs in units:
+                try:
+                    results.append((unit_id, True, fn(*args, **kwargs)))
+                except Exception as exc:
+                    results.append((unit_id, False, exc))
+            queue.complete(worker, results)
+            done += len(units)
+    except (OSError, EOFError):
+        # The coordinator went away
+        return done
+    finally:
+        stop.set()
+
+
+def start_local_workers(address: Address, count: int, authkey: Optional[bytes] = None,
+                        batch: int = 1) -> list:
+    """Worker processes on this machine, started fresh as they would be on another one."""
+    import multiprocessing as mp
+    context = mp.get_context('spawn')
+    processes = [context.Process(target=run_worker, args=(address, authkey, batch), daemon=True)
+                 for _ in range(count)]
+    for process in processes:
+        process.start()
+    return processes
+
+
+def perft_units(player: int, opponent: int, depth: int, split: int) -> Counter:
+    """Positions `split` plies down, each with its remaining depth and how often it is reached."""
+    units: Counter = Counter()
+
+    def expand(player: int, opponent: int, depth: int, split: int) -> None:
+        if depth == 0 or split == 0:
+            units[player, opponent, depth] += 1
+            return
+        moves = bitboard.legal_moves(player, opponent)
+        if not moves:
+            if not bitboard.legal_moves(opponent, player):
+                # Game over, a single leaf whatever the depth
+                units[player, opponent, 0] += 1
+                return
+            expand(opponent, player, depth - 1, split - 1)
+            return
+        for square in bitboard.iter_bits(moves):
+            flipped = bitboard.flips(player, opponent, square)
+            expand(opponent & ~flipped, player | flipped | (1 << square), depth - 1, split - 1)
+
+    expand(player, opponent, depth, split)
+    return units
+
+
+def distributed_perft(executor: Executor, depth: int, split: int) -> int:
+    import perft
+    black, white = bitboard.to_bitboards(perft.start_board())
+    units = perft_units(black, white, depth, split)
+    futures = {key: executor.submit(perft.bitboard_perft, *key) for key in units}
+    return sum(count * futures[key].result() for key, count in units.items())
+
+
+def _parse_address(text: str) -> Address:
+    host, _, port = text.rpartition(':')
+    return host or '127.0.0.1', int(port)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Distributed perft and search over TCP")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    worker = commands.add_parser('worker', help="serve a coordinator")
+    worker.add_argument('--connect', required=True, help="coordinator host:port")
+    worker.add_argument('--processes', type=int, default=os.cpu_count())
+    worker.add_argument('--authkey', help="the coordinator's key, default $OTHELLO_AUTHKEY")
+
+    jobs = []
+    for name, help_text in (('perft', "count the game tree from the start position"),
+                            ('search', "search a batch of positions with main4")):
+        job = commands.add_parser(name, help=help_text)
+        job.add_argument('--listen', default='127.0.0.1:0', help="host:port to accept workers on")
+        job.add_argument('--authkey', help="key workers must present, default $OTHELLO_AUTHKEY "
+                         "or a random one")
+        job.add_argument('--local-workers', type=int, default=0, help="worker processes to start here")
+        job.add_argument('--lease', type=float, default=30.0,
+                         help="seconds without a heartbeat before a worker's units are reissued")
+        job.add_argument('--batch', type=int, default=1, help="units a local worker leases at once")
+        jobs.append(job)
+    perft_job, search_job = jobs
+    perft_job.add_argument('--depth', type=int, default=8)
+    perft_job.add_argument('--split', type=int, default=3, help="plies expanded into work units")
+    search_job.add_argument('--positions', default='8',
+                            help="number of random positions, or a file of 'fen X|O' lines")
+    search_job.add_argument('--depth', type=int, default=5)
+    search_job.add_argument('--plies', type=int, default=20, help="random plies per position")
+    search_job.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    authkey = args.authkey.encode() if args.authkey else None
+    if args.command == 'worker':
+        address = _parse_address(args.connect)
+        if authkey is None and default_authkey() is None:
+            parser.error("worker needs the coordinator's key, --authkey or OTHELLO_AUTHKEY")
+        if args.processes == 1:
+            print(f"{run_worker(address, authkey)} units done")
+            return
+        for process in start_local_workers(address, args.processes, authkey):
+            process.join()
+        return
+
+    with Coordinator(_parse_address(args.listen), authkey, lease_time=args.lease) as coordinator:
+        host, port = coordinator.address
+        print(f"coordinator listening on {host}:{port}")
+        if authkey is None and default_authkey() is None:
+            print(f"workers connect with --authkey {coordinator.authkey.decode()}")
+        workers = start_local_workers(coordinator.address, args.local_workers, coordinator.authkey,
+                                      batch=args.batch)
+        start = time.perf_counter()
+        if args.command == 'perft':
+            import perft
+            nodes = distributed_perft(coordinator, args.depth, args.split)
+            expected = perft.START_PERFT.get(args.depth)
+            check = '' if expected is None else ' ok' if nodes == expected else f' MISMATCH, expected {expected}'
+            print(f"perft {args.depth}: {nodes} nodes{check}")
+        else:
+            import edax
+            import main4
+            import perft
+            import tournament
+            if os.path.exists(args.positions):
+                positions = [(edax.fen_to_arr(fen), color)
+                             for fen, color in tournament.load_openings(args.positions)]
+            else:
+                positions = [(board, color) for _, board, color
+                             in perft.midgame_corpus(int(args.positions), args.plies, args.seed)]
+            # One thread per position, so every position's root moves are queued together
+            with ThreadPoolExecutor(max_workers=len(positions)) as threads:
+                results = list(threads.map(
+                    lambda position: main4.search_root(*position, args.depth, executor=coordinator),
+                    positions))
+            for (board, color), (best_move, score) in zip(positions, results):
+                played = edax.bot_to_edax(best_move).upper() if best_move else 'PS'
+                print(f"{edax.arr_to_fen(board)} {'X' if color == 1 else 'O'}  {played} {score:+}")
+        elapsed = time.perf_counter() - start
+        done = dict(coordinator.queue.completed)
+        print(f"{elapsed:.2f}s, {sum(done.values())} units over {len(done)} workers, "
+              f"{coordinator.queue.reissued} reissued after a lease ran out")
+    for process in workers:
+        process.join(timeout=5)
+
+
+if __name__ == "__main__":
+    main()
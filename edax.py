@@ -1,16 +1,33 @@
+import re
 import subprocess
+import threading
 import time
+from dataclasses import dataclass, field
+from queue import Queue
+from typing import Iterable, Iterator, Optional
 
-def start_edax(edax_path="./edax"):
+def start_edax(edax_path="./edax", level=5):
     """Starts the Edax engine and returns the subprocess object."""
-    return subprocess.Popen(
-        [edax_path, '--level', '5'],
+    process = subprocess.Popen(
+        [edax_path, '--level', str(level)],
         stdin=subprocess.PIPE,
         stdout=subprocess.PIPE,
         stderr=subprocess.PIPE,
         text=True,
         bufsize=1
     )
+    # What per-call level and move-time overrides are undone to
+    process.level = level
+    return process
+
+def close_edax(edax):
+    if edax.poll() is None:
+        try:
+            write_command(edax, 'quit')
+            edax.wait(timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            edax.kill()
+            edax.wait()
 
 def read_input(edax):
     response = []
@@ -22,10 +39,14 @@ def read_input(edax):
     return "\n".join(response)
 
 
-def send_command(edax, command):
-    print('sending' , command, 'to edax')
+def write_command(edax, command):
     edax.stdin.write(f"{command}\n")
     edax.stdin.flush()
+
+
+def send_command(edax, command):
+    print('sending' , command, 'to edax')
+    write_command(edax, command)
     return read_input(edax)
 
 
@@ -55,8 +76,8 @@ def edax_to_bot(move: str) -> tuple[int, int]:
     return (int(move[1]) - 1, ord(move[0].lower()) - ord('a') )
 
 def bot_to_edax(move : tuple[int, int]) -> str:
-    x,y = move
-    return f"{chr(x + ord('a'))}{y + 1}"
+    row, col = move
+    return f"{chr(col + ord('a'))}{row + 1}"
 
 
 
@@ -86,3 +107,219 @@ def get_move(board_state, turn, edax):
     return bot_move
 
 
+
+# One row of Edax's search table, e.g. "21@98%  +2  0:00.034  173457  5101676 f5 f6 e6"
+_SEARCH_LINE_RE = re.compile(
+    r'^\s*(\d+)(?:@(\d+)%)?\s+[<>]?([+-]?\d+)\s+((?:\d+:)*\d+(?:\.\d+)?)'
+    r'\s+(\d+)(?:\s+(\d+))?\s*((?:\s*[A-Ha-h][1-8]|\s*[Pp][Ss])*)')
+_PLAY_RE = re.compile(r'Edax plays ([A-Ha-h][1-8]|[Pp][Ss]|[Pp][Aa])')
+
+
+@dataclass
+class SearchLine:
+    depth: int
+    selectivity: Optional[int]
+    score: int
+    time: float
+    nodes: int
+    speed: Optional[int]
+    pv: list[str]
+
+
+@dataclass
+class SearchResult:
+    move: str
+    # Every iteration Edax reported, shallowest first
+    lines: list[SearchLine] = field(default_factory=list)
+
+    @property
+    def last(self) -> Optional[SearchLine]:
+        return self.lines[-1] if self.lines else None
+
+    @property
+    def score(self) -> Optional[int]:
+        return self.last.score if self.lines else None
+
+    @property
+    def depth(self) -> Optional[int]:
+        return self.last.depth if self.lines else None
+
+    @property
+    def nodes(self) -> Optional[int]:
+        return self.last.nodes if self.lines else None
+
+    @property
+    def time(self) -> Optional[float]:
+        return self.last.time if self.lines else None
+
+    @property
+    def speed(self) -> Optional[int]:
+        if not self.lines:
+            return None
+        if self.last.speed is not None:
+            return self.last.speed
+        return int(self.last.nodes / self.last.time) if self.last.time else None
+
+    @property
+    def pv(self) -> list[str]:
+        return self.last.pv if self.lines else []
+
+    def time_to_depth(self, depth: int) -> Optional[float]:
+        for line in self.lines:
+            if line.depth >= depth:
+                return line.time
+        return None
+
+    @property
+    def bot_move(self) -> Optional[tuple[int, int]]:
+        if self.move.upper() in ('PS', 'PA'):
+            return None
+        return edax_to_bot(self.move)
+
+
+def parse_time(text: str) -> float:
+    seconds = 0.0
+    for part in text.split(':'):
+        seconds = seconds * 60 + float(part)
+    return seconds
+
+
+def parse_search_line(line: str) -> Optional[SearchLine]:
+    match = _SEARCH_LINE_RE.match(line.lstrip('> '))
+    if not match:
+        return None
+    depth, selectivity, score, elapsed, nodes, speed, pv = match.groups()
+    return SearchLine(
+        depth=int(depth),
+        selectivity=int(selectivity) if selectivity else None,
+        score=int(score),
+        time=parse_time(elapsed),
+        nodes=int(nodes),
+        speed=int(speed) if speed else None,
+        pv=pv.split(),
+    )
+
+
+def parse_search_output(output: str) -> SearchResult:
+    """Parses everything Edax printed for one 'go' into a SearchResult."""
+    result = SearchResult('')
+    for line in output.splitlines():
+        match = _PLAY_RE.search(line)
+        if match:
+            result.move = match.group(1)
+            continue
+        search_line = parse_search_line(line)
+        if search_line:
+            result.lines.append(search_line)
+    return result
+
+
+def read_result(edax) -> SearchResult:
+    """Reads Edax's search output up to and including its 'Edax plays' line."""
+    result = SearchResult('')
+    while True:
+        line = edax.stdout.readline()
+        if not line:
+            raise EOFError("edax exited before answering")
+        match = _PLAY_RE.search(line)
+        if match:
+            result.move = match.group(1)
+            return result
+        search_line = parse_search_line(line)
+        if search_line:
+            result.lines.append(search_line)
+
+
+def limit_commands(level: Optional[int] = None, move_time: Optional[float] = None) -> list[str]:
+    commands = []
+    if level is not None:
+        commands.append(f'level {level}')
+    if move_time is not None:
+        commands.append(f'move-time {move_time}')
+    return commands
+
+
+def restore_commands(start_level: int, level: Optional[int] = None,
+                     move_time: Optional[float] = None) -> list[str]:
+    """Undoes limit_commands(level, move_time), back to the level the process started at."""
+    # 'level' also takes Edax out of the time per move that 'move-time' switched it to
+    if level is None and move_time is None:
+        return []
+    return [f'level {start_level}']
+
+
+def search(edax, board: list[list[int]], color: int, level: Optional[int] = None,
+           move_time: Optional[float] = None) -> SearchResult:
+    """Searches one position, optionally at another level or seconds per move for this search only."""
+    player_map = {1: 'X', -1: 'O'}
+    for command in limit_commands(level, move_time):
+        write_command(edax, command)
+    write_command(edax, f'setboard {arr_to_fen(board)} {player_map[color]}')
+    write_command(edax, 'go')
+    # Edax runs commands in order, so the restore takes effect once this search is done
+    for command in restore_commands(getattr(edax, 'level', 5), level, move_time):
+        write_command(edax, command)
+    return read_result(edax)
+
+
+def analyze_positions(positions: Iterable[tuple[list[list[int]], int]], edax,
+                      window: int = 32, level: Optional[int] = None,
+                      move_time: Optional[float] = None) -> Iterator[tuple[list[list[int]], int, SearchResult]]:
+    """Streams (board, color) positions through Edax, yielding results in order.
+
+    Commands for up to `window` positions are written ahead by a feeder thread
+    while replies are parsed here, so Edax never waits on a round trip. level
+    and move_time apply to these positions only.
+    """
+    player_map = {1: 'X', -1: 'O'}
+    pending: Queue = Queue()
+    slots = threading.Semaphore(window)
+    stop = threading.Event()
+    done = object()
+    errors = []
+
+    def feed():
+        try:
+            for board, color in positions:
+                slots.acquire()
+                if stop.is_set():
+                    return
+                write_command(edax, f'setboard {arr_to_fen(board)} {player_map[color]}')
+                write_command(edax, 'go')
+                pending.put((board, color))
+        except Exception as exc:
+            errors.append(exc)
+        finally:
+            pending.put(done)
+
+    for command in limit_commands(level, move_time):
+        write_command(edax, command)
+    feeder = threading.Thread(target=feed, daemon=True)
+    feeder.start()
+    item = None
+    try:
+        while True:
+            item = pending.get()
+            if item is done:
+                break
+            board, color = item
+            result = read_result(edax)
+            slots.release()
+            yield board, color, result
+        if errors:
+            raise errors[0]
+    finally:
+        stop.set()
+        slots.release()
+        # When the caller stops early, the replies to positions already written
+        # would otherwise be read as the answers to its next search
+        try:
+            while item is not done:
+                item = pending.get()
+                if item is not done:
+                    read_result(edax)
+            for command in restore_commands(getattr(edax, 'level', 5), level, move_time):
+                write_command(edax, command)
+        except (OSError, EOFError):
+            # Edax is gone, nothing is left to read or restore
+            pass
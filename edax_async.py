@@ -0,0 +1,144 @@
+import asyncio
+import re
+from typing import Iterable, List, Optional, Tuple
+
+import edax
+
+# Edax announces its choice as e.g. "Edax plays F5" (or "PS" when it passes)
+_PLAY_RE = re.compile(r'Edax plays ([A-Ha-h][1-8]|[Pp][Ss]|[Pp][Aa])')
+
+PLAYER_MAP = {1: 'X', -1: 'O'}
+
+
+class AsyncEdax:
+    """Drives a single Edax process from an asyncio event loop."""
+
+    def __init__(self, process: asyncio.subprocess.Process, timeout: float = 30.0, level: int = 5):
+        self.process = process
+        self.timeout = timeout
+        # What per-call level and move-time overrides are undone to
+        self.level = level
+        self._buffer = ''
+        self._stale = 0
+        self._lock = asyncio.Lock()
+
+    @classmethod
+    async def start(cls, edax_path: str = "./edax", level: int = 5,
+                    timeout: float = 30.0) -> 'AsyncEdax':
+        process = await asyncio.create_subprocess_exec(
+            edax_path, '--level', str(level),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        return cls(process, timeout, level)
+
+    @property
+    def alive(self) -> bool:
+        return self.process.returncode is None
+
+    async def _write(self, *commands: str) -> None:
+        # Every command is buffered before the first await, so a cancel sends all or none
+        self.process.stdin.write(''.join(f"{command}\n" for command in commands).encode())
+        await asyncio.wait_for(self.process.stdin.drain(), self.timeout)
+
+    async def _read_move(self) -> Tuple[str, str]:
+        # Edax's prompt is not always newline terminated, so scan raw chunks
+        # for the "Edax plays" line instead of relying on readline().
+        while True:
+            match = _PLAY_RE.search(self._buffer)
+            if match:
+                output = self._buffer[:match.end()]
+                self._buffer = self._buffer[match.end():]
+                if self._stale:
+                    self._stale -= 1
+                    continue
+                return match.group(1), output
+            chunk = await self.process.stdout.read(4096)
+            if not chunk:
+                raise EOFError("edax exited before answering")
+            self._buffer += chunk.decode(errors='replace')
+
+    async def go(self, fen: str, turn: str, timeout: Optional[float] = None,
+                 level: Optional[int] = None,
+                 move_time: Optional[float] = None) -> edax.SearchResult:
+        """Searches the position and returns Edax's move and search lines.
+
+        level and move_time, when given, apply to this search only.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        # The restore is queued behind the search, so a cancelled one is restored after too
+        commands = (edax.limit_commands(level, move_time) + [f'setboard {fen} {turn}', 'go']
+                    + edax.restore_commands(self.level, level, move_time))
+        async with self._lock:
+            try:
+                # From here on 'go' has been sent, however the wait below ends
+                await self._write(*commands)
+                move, output = await asyncio.wait_for(self._read_move(), timeout)
+            except asyncio.TimeoutError:
+                # A stalled engine is useless, make sure it can't linger
+                self.kill()
+                raise
+            except asyncio.CancelledError:
+                # The reply will still arrive, skip it on the next request
+                self._stale += 1
+                raise
+        result = edax.parse_search_output(output)
+        result.move = move
+        return result
+
+    async def get_move(self, board_state: List[List[int]], turn: int,
+                       timeout: Optional[float] = None) -> Optional[Tuple[int, int]]:
+        result = await self.go(edax.arr_to_fen(board_state), PLAYER_MAP[turn], timeout)
+        return result.bot_move
+
+    def kill(self) -> None:
+        if self.alive:
+            self.process.kill()
+
+    async def close(self) -> None:
+        if self.alive:
+            try:
+                await self._write('quit')
+                await asyncio.wait_for(self.process.wait(), self.timeout)
+            except (asyncio.TimeoutError, ConnectionError):
+                self.kill()
+        await self.process.wait()
+
+
+async def map_moves(positions: Iterable[Tuple[List[List[int]], int]],
+                    edax_path: str = "./edax", engines: int = 8, level: int = 5,
+                    timeout: float = 30.0) -> List[Optional[Tuple[int, int]]]:
+    """Spreads (board, color) positions over a pool of Edax processes.
+
+    Results come back in input order; a position whose engine timed out or
+    died is reported as None and that engine is restarted.
+    """
+    positions = list(positions)
+    if not positions:
+        return []
+    results: List[Optional[Tuple[int, int]]] = [None] * len(positions)
+    queue: asyncio.Queue = asyncio.Queue()
+    for item in enumerate(positions):
+        queue.put_nowait(item)
+
+    async def worker() -> None:
+        engine = await AsyncEdax.start(edax_path, level, timeout)
+        try:
+            while True:
+                try:
+                    index, (board, color) = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                try:
+                    results[index] = await engine.get_move(board, color)
+                except (asyncio.TimeoutError, EOFError, OSError):
+                    # OSError is a write to an engine that died, BrokenPipeError or ConnectionResetError
+                    engine.kill()
+                    await engine.close()
+                    engine = await AsyncEdax.start(edax_path, level, timeout)
+        finally:
+            await engine.close()
+
+    await asyncio.gather(*(worker() for _ in range(max(1, min(engines, len(positions))))))
+    return results
@@ -0,0 +1,288 @@
+"""One engine interface over the mainN.py variants and their parts.
+
+Every engine has `search(position, limits) -> SearchResult`. Engines are
+built from a spec string so tournaments and benchmarks can A/B them in one
+process:
+
+    engine = engines.create('alphabeta:movegen=bitboard,evaluator=main4,depth=5')
+    result = engine.search(Position(board, 1), Limits(time=0.5))
+
+`alphabeta` combines any registered move generator and evaluator, `mcts` is
+the Monte Carlo tree search in mcts.py, and the other registered names wrap a
+variant's own move() unchanged.
+"""
+import importlib
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+import bitboard
+from limits import Limits
+
+Board = List[List[int]]
+Move = Optional[Tuple[int, int]]
+
+
+@dataclass
+class Position:
+    board: Board
+    color: int
+
+
+@dataclass
+class SearchResult:
+    move: Move
+    score: Optional[float] = None
+    depth: Optional[int] = None
+    nodes: Optional[int] = None
+    time: float = 0.0
+
+
+@dataclass
+class MoveGenerator:
+    moves: Callable[[Board, int], List[Tuple[int, int]]]
+    play: Callable[[Board, Tuple[int, int], int], Board]
+
+
+MOVE_GENERATORS: Dict[str, Callable[[], MoveGenerator]] = {}
+EVALUATORS: Dict[str, Callable[[], Callable[[Board, int], float]]] = {}
+ENGINES: Dict[str, Callable[..., object]] = {}
+
+
+def register(table: dict, name: str):
+    def decorator(factory):
+        table[name] = factory
+        return factory
+    return decorator
+
+
+def _list_module_generator(module_name: str) -> MoveGenerator:
+    # main.py/main2.py/main3.py: list boards, make_move mutates in place and
+    # get_valid_moves may list a square once per direction it is reached from
+    module = importlib.import_module(module_name)
+
+    def moves(board, color):
+        return list(dict.fromkeys(module.get_valid_moves(board, color)))
+
+    def play(board, played, color):
+        new_board = [row[:] for row in board]
+        module.make_move(new_board, played[0], played[1], color)
+        return new_board
+    return MoveGenerator(moves, play)
+
+
+for _name in ('main', 'main2', 'main3'):
+    register(MOVE_GENERATORS, _name)(lambda name=_name: _list_module_generator(name))
+
+
+@register(MOVE_GENERATORS, 'main4')
+def _main4_generator() -> MoveGenerator:
+    import main4
+
+    def moves(board, color):
+        return sorted(main4.get_valid_moves(main4.BoardState.from_list(board), color))
+
+    def play(board, played, color):
+        return main4.make_move(board, played[0], played[1], color)
+    return MoveGenerator(moves, play)
+
+
+@register(MOVE_GENERATORS, 'bitboard')
+def _bitboard_generator() -> MoveGenerator:
+    def split(board, color):
+        black, white = bitboard.to_bitboards(board)
+        return (black, white) if color == 1 else (white, black)
+
+    def moves(board, color):
+        player, opponent = split(board, color)
+        return [divmod(square, 8) for square in bitboard.iter_bits(bitboard.legal_moves(player, opponent))]
+
+    def play(board, played, color):
+        player, opponent = split(board, color)
+        square = played[0] * 8 + played[1]
+        flipped = bitboard.flips(player, opponent, square)
+        player |= flipped | (1 << square)
+        opponent &= ~flipped
+        return bitboard.from_bitboards(*((player, opponent) if color == 1 else (opponent, player)))
+    return MoveGenerator(moves, play)
+
+
+@register(EVALUATORS, 'main4')
+def _main4_evaluator():
+    import main4
+    return lambda board, color: main4.evaluate_position(main4.BoardState.from_list(board), color)
+
+
+for _name in ('main', 'main2', 'main3'):
+    register(EVALUATORS, _name)(
+        lambda name=_name: importlib.import_module(name).evaluate_position)
+
+
+@register(EVALUATORS, 'features')
+def _features_evaluator():
+    import features
+    return features.evaluate_board
+
+
+@register(EVALUATORS, 'disc')
+def _disc_evaluator():
+    return lambda board, color: sum(row.count(color) - row.count(-color) for row in board)
+
+
+class _Timeout(Exception):
+    pass
+
+
+class AlphaBetaEngine:
+    """Iterative deepening negamax over a pluggable move generator and evaluator."""
+
+    # Finished games outrank any heuristic score
+    WIN = 10_000
+
+    def __init__(self, movegen: str = 'main4', evaluator: str = 'main4', depth: int = 6):
+        self.name = f"alphabeta:movegen={movegen},evaluator={evaluator},depth={depth}"
+        self.generator = MOVE_GENERATORS[movegen]()
+        self.evaluate = EVALUATORS[evaluator]()
+        self.default_depth = int(depth)
+        self.nodes = 0
+        self.deadline: Optional[float] = None
+
+    def _negamax(self, board: Board, color: int, depth: int, alpha: float, beta: float) -> float:
+        self.nodes += 1
+        if self.deadline is not None and self.nodes % 256 == 0 and time.perf_counter() > self.deadline:
+            raise _Timeout
+        moves = self.generator.moves(board, color)
+        if not moves:
+            if not self.generator.moves(board, -color):
+                discs = sum(row.count(color) - row.count(-color) for row in board)
+                return discs * self.WIN
+            if depth == 0:
+                return self.evaluate(board, color)
+            return -self._negamax(board, -color, depth - 1, -beta, -alpha)
+        if depth == 0:
+            return self.evaluate(board, color)
+        best_score = float('-inf')
+        for played in moves:
+            score = -self._negamax(self.generator.play(board, played, color), -color,
+                                   depth - 1, -beta, -alpha)
+            if score > best_score:
+                best_score = score
+                alpha = max(alpha, score)
+                if alpha >= beta:
+                    break
+        return best_score
+
+    def _search_depth(self, position: Position, depth: int,
+                      order: List[Tuple[int, int]]) -> Tuple[Tuple[int, int], float]:
+        best_move, best_score = order[0], float('-inf')
+        alpha = float('-inf')
+        for played in order:
+            score = -self._negamax(self.generator.play(position.board, played, position.color),
+                                   -position.color, depth - 1, float('-inf'), -alpha)
+            if score > best_score:
+                best_move, best_score = played, score
+                alpha = score
+        return best_move, best_score
+
+    def search(self, position: Position, limits: Limits) -> SearchResult:
+        start = time.perf_counter()
+        self.nodes = 0
+        moves = self.generator.moves(position.board, position.color)
+        if not moves:
+            return SearchResult(None, nodes=0)
+        max_depth = limits.depth or self.default_depth
+        self.deadline = start + limits.time if limits.time else None
+        result = SearchResult(moves[0], depth=0)
+        # Without a time limit only the final depth is searched
+        first_depth = 1 if self.deadline else max_depth
+        for depth in range(first_depth, max_depth + 1):
+            try:
+                best_move, best_score = self._search_depth(position, depth, moves)
+            except _Timeout:
+                break
+            result = SearchResult(best_move, best_score, depth)
+            # Search the previous best move first on the next iteration
+            moves = [best_move] + [played for played in moves if played != best_move]
+        self.deadline = None
+        result.nodes = self.nodes
+        result.time = time.perf_counter() - start
+        return result
+
+
+class ModuleEngine:
+    """Wraps a variant's own move(board, color)."""
+
+    def __init__(self, module_name: str):
+        self.name = module_name
+        self.module = importlib.import_module(module_name)
+
+    def search(self, position: Position, limits: Limits) -> SearchResult:
+        start = time.perf_counter()
+        best_move = self.module.move(position.board, position.color)
+        return SearchResult(best_move, time=time.perf_counter() - start)
+
+
+class Main4Engine:
+    """main4's parallel root search, with its score, depth and node count."""
+
+    name = 'main4'
+
+    def __init__(self):
+        import main4
+        self.main4 = main4
+
+    def search(self, position: Position, limits: Limits) -> SearchResult:
+        start = time.perf_counter()
+        stats = self.main4.SearchStats()
+        best_move, score = self.main4.search_root(position.board, position.color,
+                                                  limits.depth, stats=stats)
+        return SearchResult(best_move, score if best_move else None, stats.depth or None,
+                            stats.nodes, time.perf_counter() - start)
+
+
+register(ENGINES, 'alphabeta')(AlphaBetaEngine)
+register(ENGINES, 'main4')(Main4Engine)
+
+
+@register(ENGINES, 'mcts')
+def _mcts_engine(**options):
+    # Imported on first use, it is the only engine that needs numpy
+    import mcts
+    return mcts.MCTSEngine(**options)
+
+
+# main3's move() nests a Pool inside pool workers and can't run, but its move
+# generator and evaluator are still available to alphabeta
+for _name in ('main', 'main2'):
+    register(ENGINES, _name)(lambda name=_name: ModuleEngine(name))
+
+
+def parse_spec(spec: str) -> Tuple[str, Dict[str, str]]:
+    name, _, options = spec.partition(':')
+    kwargs = {}
+    for option in filter(None, options.split(',')):
+        key, _, value = option.partition('=')
+        kwargs[key.strip()] = value.strip()
+    return name, kwargs
+
+
+def is_registered(spec: str) -> bool:
+    return parse_spec(spec)[0] in ENGINES
+
+
+def create(spec: str):
+    name, kwargs = parse_spec(spec)
+    if name not in ENGINES:
+        raise ValueError(f"unknown engine {name!r}, choose from {sorted(ENGINES)}")
+    return ENGINES[name](**kwargs)
+
+
+def as_bot(engine, limits: Optional[Limits] = None) -> Callable[[Board, int], Move]:
+    """Adapts an engine to the bot(board, color) signature play_game expects."""
+    limits = limits or Limits()
+
+    def bot(board: Board, player_color: int) -> Move:
+        return engine.search(Position(board, player_color), limits).move
+    # Whoever holds the bot can release what the engine holds, like mcts's pool
+    bot.close = getattr(engine, 'close', lambda: None)
+    return bot
@@ -0,0 +1,117 @@
+"""Stability, frontier and mobility features, cheap enough for every leaf.
+
+The list-board evaluators look at corners (main.py) or square weights
+(main4.py). Counting stable or frontier discs over nested lists would cost
+more than the rest of the search put together. bitboard.py computes them with
+directional fills in a few microseconds, and evaluate() combines them. Scores
+are from the side to move's point of view and antisymmetric, like main4's.
+
+It is registered as the `features` evaluator for engines.AlphaBetaEngine:
+
+    python tournament.py -e alphabeta:evaluator=features,depth=4 -e alphabeta:depth=4
+    python features.py --positions 2000      # per-call cost of each feature
+"""
+import argparse
+import time
+from typing import Callable, Dict, List, NamedTuple, Tuple
+
+import bitboard
+
+CORNERS = 0x8100000000000081
+
+
+class Features(NamedTuple):
+    # Each is the side to move's count minus the opponent's
+    mobility: int
+    potential_mobility: int
+    stable: int
+    frontier: int
+    corners: int
+
+
+# Fewer frontier discs are better, they hand the opponent moves
+WEIGHTS = Features(mobility=10, potential_mobility=4, stable=20, frontier=-6, corners=30)
+
+
+def _count(x: int) -> int:
+    return bin(x).count('1')
+
+
+def extract(player: int, opponent: int) -> Features:
+    return Features(
+        _count(bitboard.legal_moves(player, opponent)) - _count(bitboard.legal_moves(opponent, player)),
+        _count(bitboard.potential_mobility(player, opponent))
+        - _count(bitboard.potential_mobility(opponent, player)),
+        _count(bitboard.stable_discs(player, opponent)) - _count(bitboard.stable_discs(opponent, player)),
+        _count(bitboard.frontier(player, opponent)) - _count(bitboard.frontier(opponent, player)),
+        _count(player & CORNERS) - _count(opponent & CORNERS),
+    )
+
+
+def evaluate(player: int, opponent: int) -> int:
+    return sum(weight * value for weight, value in zip(WEIGHTS, extract(player, opponent)))
+
+
+def evaluate_board(board: List[List[int]], color: int) -> int:
+    """evaluate() for a list board, the engines.EVALUATORS signature."""
+    black, white = bitboard.to_bitboards(board)
+    return evaluate(black, white) if color == 1 else evaluate(white, black)
+
+
+def _time_per_call(fn: Callable, positions: List[Tuple[int, int]], repeat: int,
+                   reset: Callable[[], None] = lambda: None) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        reset()
+        start = time.perf_counter()
+        for player, opponent in positions:
+            fn(player, opponent)
+        best = min(best, time.perf_counter() - start)
+    return best / len(positions)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Per-call cost of the evaluation features")
+    parser.add_argument('--positions', type=int, default=2000)
+    parser.add_argument('--plies', type=int, default=30, help="random plies per position")
+    parser.add_argument('--repeat', type=int, default=5, help="best of this many passes")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    import main4
+    import perft
+    corpus = perft.midgame_corpus(args.positions, args.plies, args.seed)
+    positions = []
+    for _, board, color in corpus:
+        black, white = bitboard.to_bitboards(board)
+        positions.append((black, white) if color == 1 else (white, black))
+    # main4's evaluator and move generator are lru_cached, time them cold
+    main4_evaluate = main4.evaluate_position.__wrapped__
+    main4_boards = {(player, opponent): main4.BoardState.from_list(bitboard.from_bitboards(player, opponent))
+                    for player, opponent in positions}
+
+    benchmarks: Dict[str, Callable] = {
+        'legal_moves': bitboard.legal_moves,
+        'stable_discs': bitboard.stable_discs,
+        'frontier': bitboard.frontier,
+        'potential_mobility': bitboard.potential_mobility,
+        'extract': extract,
+        'evaluate': evaluate,
+        'main4.evaluate_position': lambda player, opponent: main4_evaluate(main4_boards[player, opponent], 1),
+    }
+
+    def reset() -> None:
+        # Cold for main4 means its move cache and the GameCache tables it fills are empty too
+        main4.get_valid_moves.cache_clear()
+        main4.GameCache.clear()
+
+    print(f"{len(positions)} positions after {args.plies} random plies, best of {args.repeat}")
+    for name, fn in benchmarks.items():
+        per_call = _time_per_call(fn, positions, args.repeat, reset)
+        print(f"{name:<24} {per_call * 1e6:8.2f} us/call")
+    stable = sum(_count(bitboard.stable_discs(*position)) for position in positions)
+    print(f"{stable / len(positions):.2f} stable discs per position for the side to move")
+
+
+if __name__ == "__main__":
+    main()
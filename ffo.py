@@ -0,0 +1,156 @@
+"""FFO endgame benchmark with solve-time regression tracking.
+
+Runs the FFO test positions through main4's exact solver path, checks the
+best move and exact score of each, and records time and nodes per position.
+The suite is read from an .obf file in Edax's problem format, one position
+per line:
+
+    O--OOOOX-OOOOOOX...--------- X; A2:+38; B1:+36; ...
+
+Edax ships #40-#59 as problem/fforum-40-59.obf; copy it to data/ or pass
+--suite. Their 20-24 empties are hours of work for a pure Python solver even
+with move ordering, so pick positions with --only or --max-empties, or use a
+suite of shallower ones. A run compared against --baseline fails when any position (or the
+whole suite) takes longer than --threshold times its baseline time:
+
+    python ffo.py --baseline data/ffo_baseline.json --update   # record
+    python ffo.py --baseline data/ffo_baseline.json            # check
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from dataclasses import dataclass
+from typing import Dict, List
+
+import edax
+import main4
+
+DEFAULT_SUITE = os.path.join('data', 'fforum-40-59.obf')
+
+
+@dataclass
+class Problem:
+    name: str
+    board: List[List[int]]
+    color: int
+    # Every scored move in the file, best first
+    scores: Dict[str, int]
+
+    @property
+    def empties(self) -> int:
+        return sum(row.count(0) for row in self.board)
+
+    @property
+    def best_score(self) -> int:
+        return max(self.scores.values())
+
+    @property
+    def best_moves(self) -> List[str]:
+        return [move for move, score in self.scores.items() if score == self.best_score]
+
+
+def parse_obf(text: str, first_number: int = 40) -> List[Problem]:
+    problems = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith('%') or line.startswith('#'):
+            continue
+        fields = [field.strip() for field in line.split(';') if field.strip()]
+        cells, side = fields[0].split()
+        board = [[1 if ch == 'X' else -1 if ch == 'O' else 0 for ch in cells[row * 8:row * 8 + 8]]
+                 for row in range(8)]
+        scores = {}
+        for field in fields[1:]:
+            move, score = field.split(':')
+            scores[move.strip().upper()] = int(score)
+        problems.append(Problem(f"ffo-{first_number + len(problems)}", board,
+                                1 if side.upper() == 'X' else -1, scores))
+    return problems
+
+
+def solve_problem(problem: Problem) -> dict:
+    stats = main4.SearchStats()
+    start = time.perf_counter()
+    # Searching to the number of empties sends every root move to the exact solver
+    best_move, score = main4.search_root(problem.board, problem.color,
+                                         search_depth=problem.empties, stats=stats)
+    elapsed = time.perf_counter() - start
+    move_text = edax.bot_to_edax(best_move).upper() if best_move else 'PS'
+    return {
+        'name': problem.name,
+        'empties': problem.empties,
+        'move': move_text,
+        'score': score,
+        'expected_moves': problem.best_moves,
+        'expected_score': problem.best_score,
+        'correct': move_text in problem.best_moves and score == problem.best_score,
+        'time': round(elapsed, 4),
+        'nodes': stats.nodes,
+        'nps': round(stats.nodes / elapsed) if elapsed else None,
+    }
+
+
+def check_regressions(results: List[dict], baseline: dict, threshold: float) -> List[str]:
+    failures = []
+    previous = {entry['name']: entry for entry in baseline.get('positions', [])}
+    for result in results:
+        old = previous.get(result['name'])
+        if old and old['time'] > 0 and result['time'] > old['time'] * threshold:
+            failures.append(f"{result['name']}: {result['time']:.2f}s vs baseline {old['time']:.2f}s")
+    total = sum(result['time'] for result in results)
+    old_total = sum(previous[result['name']]['time'] for result in results if result['name'] in previous)
+    if old_total and total > old_total * threshold:
+        failures.append(f"total: {total:.2f}s vs baseline {old_total:.2f}s")
+    return failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="FFO endgame solve benchmark")
+    parser.add_argument('--suite', default=DEFAULT_SUITE)
+    parser.add_argument('--first', type=int, default=40, help="FFO number of the first line")
+    parser.add_argument('--only', action='append', help="run just these names, e.g. ffo-40")
+    parser.add_argument('--max-empties', type=int, help="skip positions with more empties")
+    parser.add_argument('--baseline', help="JSON file of a previous run to compare against")
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help="allowed slowdown factor against the baseline")
+    parser.add_argument('--update', action='store_true', help="write this run as the new baseline")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.suite):
+        parser.error(f"{args.suite} not found, copy Edax's problem/fforum-40-59.obf there")
+    with open(args.suite) as f:
+        problems = parse_obf(f.read(), args.first)
+    if args.only:
+        problems = [problem for problem in problems if problem.name in args.only]
+    if args.max_empties is not None:
+        problems = [problem for problem in problems if problem.empties <= args.max_empties]
+
+    results = []
+    for problem in problems:
+        result = solve_problem(problem)
+        results.append(result)
+        status = 'ok' if result['correct'] else \
+            f"WRONG, expected {'/'.join(result['expected_moves'])} {result['expected_score']:+d}"
+        print(f"{result['name']:<8} {result['empties']:>3} empties  {result['move']} "
+              f"{result['score']:+3d}  {result['time']:>9.2f}s {result['nodes']:>12} nodes  {status}")
+
+    report = {'positions': results, 'time': round(sum(r['time'] for r in results), 4),
+              'nodes': sum(r['nodes'] for r in results)}
+    failures = [f"{r['name']}: wrong answer" for r in results if not r['correct']]
+    if args.baseline and os.path.exists(args.baseline) and not args.update:
+        with open(args.baseline) as f:
+            failures += check_regressions(results, json.load(f), args.threshold)
+    if args.baseline and args.update:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    print(f"total {report['time']:.2f}s, {report['nodes']} nodes")
+    for failure in failures:
+        print(f"FAIL {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
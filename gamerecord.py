@@ -0,0 +1,285 @@
+"""Compact on-disk game records.
+
+A record file starts with a 6 byte header (b'OTGR' + version) followed by
+length-prefixed games. Each game is a small JSON header (players, result,
+start position, anything else) and its moves, one byte per move: row * 8 + col,
+or 64 for a pass. A sidecar `.idx` file of 8-byte offsets gives random access
+by game index and is rebuilt by scanning when missing or stale.
+
+    with GameWriter('games.ogr') as writer:
+        writer.write(GameRecord(moves, black='main4', white='edax:5', result=12))
+    reader = GameReader('games.ogr')
+    game = reader[1000]
+    print(game.to_ggf())
+"""
+import json
+import os
+import re
+import struct
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import edax
+import main4
+
+MAGIC = b'OTGR'
+VERSION = 1
+FILE_HEADER = struct.Struct('<4sH')
+RECORD_HEADER = struct.Struct('<IH')
+MOVE_COUNT = struct.Struct('<H')
+OFFSET = struct.Struct('<Q')
+PASS = 64
+
+Move = Optional[Tuple[int, int]]
+
+
+@dataclass
+class GameRecord:
+    moves: List[Move]
+    black: str = ''
+    white: str = ''
+    # Black discs minus white discs at the end, None if unknown
+    result: Optional[int] = None
+    # Start position in edax.arr_to_fen form, None for the standard start
+    fen: Optional[str] = None
+    turn: int = 1
+    extra: Dict = field(default_factory=dict)
+
+    def start_board(self) -> List[List[int]]:
+        return main4.create_board() if self.fen is None else edax.fen_to_arr(self.fen)
+
+    def positions(self) -> Iterator[Tuple[List[List[int]], int, Move]]:
+        """Yields (board, side to move, move played) for every move of the game."""
+        board, color = self.start_board(), self.turn
+        for played in self.moves:
+            yield board, color, played
+            if played is not None:
+                board = main4.make_move(board, played[0], played[1], color)
+            color = -color
+
+    def final_board(self) -> List[List[int]]:
+        board = self.start_board()
+        for board, color, played in self.positions():
+            if played is not None:
+                board = main4.make_move(board, played[0], played[1], color)
+        return board
+
+    def to_fens(self) -> List[str]:
+        """Every position of the game, start and final included, as 'fen X|O'."""
+        fens = [f"{edax.arr_to_fen(board)} {'X' if color == 1 else 'O'}"
+                for board, color, _ in self.positions()]
+        color = self.turn if len(self.moves) % 2 == 0 else -self.turn
+        fens.append(f"{edax.arr_to_fen(self.final_board())} {'X' if color == 1 else 'O'}")
+        return fens
+
+    @classmethod
+    def from_fens(cls, fens: List[str], **header) -> 'GameRecord':
+        """Rebuilds the move list from consecutive 'fen X|O' positions."""
+        boards = [(edax.fen_to_arr(fen.split()[0]), fen.split()[1].upper()) for fen in fens]
+        moves: List[Move] = []
+        for (before, _), (after, _) in zip(boards, boards[1:]):
+            placed = [(row, col) for row in range(8) for col in range(8)
+                      if before[row][col] == 0 and after[row][col] != 0]
+            if len(placed) > 1:
+                raise ValueError("positions are more than one move apart")
+            moves.append(placed[0] if placed else None)
+        start_fen, start_turn = boards[0]
+        if start_fen == main4.create_board() and start_turn == 'X':
+            fen = None
+        else:
+            fen = edax.arr_to_fen(start_fen)
+        header.setdefault('turn', 1 if start_turn == 'X' else -1)
+        return cls(moves, fen=fen, **header)
+
+    def to_ggf(self) -> str:
+        board = self.start_board()
+        cells = ' '.join(''.join('*' if cell == 1 else 'O' if cell == -1 else '-' for cell in row)
+                         for row in board)
+        parts = ['(;GM[Othello]', f'PB[{self.black}]', f'PW[{self.white}]', 'TY[8]']
+        if self.result is not None:
+            parts.append(f'RE[{self.result:+d}]')
+        parts.append(f"BO[8 {cells} {'*' if self.turn == 1 else 'O'}]")
+        color = self.turn
+        for played in self.moves:
+            text = 'PA' if played is None else edax.bot_to_edax(played).upper()
+            parts.append(f"{'B' if color == 1 else 'W'}[{text}]")
+            color = -color
+        parts.append(';)')
+        return ''.join(parts)
+
+    @classmethod
+    def from_ggf(cls, text: str) -> 'GameRecord':
+        tags = re.findall(r'([A-Z]+)\[([^\]]*)\]', text)
+        header = {key: value for key, value in tags if key not in ('B', 'W')}
+        record = cls([], black=header.get('PB', ''), white=header.get('PW', ''))
+        if header.get('RE'):
+            try:
+                record.result = int(float(header['RE'].split(':')[0]))
+            except ValueError:
+                # RE[?] and the like, the result is just unknown
+                pass
+        expected = None
+        if 'BO' in header:
+            # The board may be one token or eight space separated rows
+            _, *rows, turn = header['BO'].split()
+            cells = ''.join(rows)
+            board = [[1 if ch == '*' else -1 if ch == 'O' else 0 for ch in cells[row * 8:row * 8 + 8]]
+                     for row in range(8)]
+            record.turn = 1 if turn == '*' else -1
+            if board != main4.create_board() or record.turn != 1:
+                record.fen = edax.arr_to_fen(board)
+            expected = record.turn
+        for key, value in tags:
+            if key not in ('B', 'W'):
+                continue
+            color = 1 if key == 'B' else -1
+            if expected is not None and color != expected:
+                # GGF may leave out passes, put them back so colours alternate
+                record.moves.append(None)
+            square = value.split('/')[0].strip()
+            record.moves.append(None if square.upper() in ('PA', 'PS', '') else edax.edax_to_bot(square))
+            expected = -color
+        return record
+
+    def encode(self) -> bytes:
+        header = {'black': self.black, 'white': self.white, 'result': self.result}
+        if self.fen is not None:
+            header['fen'] = self.fen
+        if self.turn != 1:
+            header['turn'] = self.turn
+        header.update(self.extra)
+        meta = json.dumps(header, separators=(',', ':')).encode()
+        moves = bytes(PASS if played is None else played[0] * 8 + played[1] for played in self.moves)
+        body = meta + MOVE_COUNT.pack(len(moves)) + moves
+        return RECORD_HEADER.pack(len(body), len(meta)) + body
+
+    @classmethod
+    def decode(cls, body: bytes, meta_length: int) -> 'GameRecord':
+        header = json.loads(body[:meta_length])
+        (count,) = MOVE_COUNT.unpack_from(body, meta_length)
+        start = meta_length + MOVE_COUNT.size
+        moves = [None if byte == PASS else divmod(byte, 8) for byte in body[start:start + count]]
+        return cls(moves, black=header.pop('black', ''), white=header.pop('white', ''),
+                   result=header.pop('result', None), fen=header.pop('fen', None),
+                   turn=header.pop('turn', 1), extra=header)
+
+
+def read_ggf(text: str) -> Iterator[GameRecord]:
+    for match in re.finditer(r'\(;.*?;\)', text, re.S):
+        yield GameRecord.from_ggf(match.group(0))
+
+
+class GameWriter:
+    """Appends games to a record file and its offset index."""
+
+    def __init__(self, path: str):
+        self.path = path
+        new = not os.path.exists(path) or os.path.getsize(path) == 0
+        if not new:
+            # Drop a torn record left by a crash and make sure the index covers the rest
+            with GameReader(path) as reader:
+                end = reader.end
+            os.truncate(path, end)
+        self.file = open(path, 'ab')
+        # A new file must not inherit a leftover index
+        self.index = open(path + '.idx', 'wb' if new else 'ab')
+        if new:
+            self.file.write(FILE_HEADER.pack(MAGIC, VERSION))
+
+    def write(self, record: GameRecord) -> None:
+        self.index.write(OFFSET.pack(self.file.tell()))
+        self.file.write(record.encode())
+
+    def flush(self) -> None:
+        self.file.flush()
+        self.index.flush()
+
+    def close(self) -> None:
+        self.file.close()
+        self.index.close()
+
+    def __enter__(self) -> 'GameWriter':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class GameReader:
+    """Streams games in order, or fetches them by index."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file = open(path, 'rb')
+        magic, version = FILE_HEADER.unpack(self.file.read(FILE_HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} game record file")
+        self.offsets = self._load_index()
+
+    def _load_index(self) -> List[int]:
+        size = os.fstat(self.file.fileno()).st_size
+        index_path = self.path + '.idx'
+        offsets = []
+        if os.path.exists(index_path):
+            with open(index_path, 'rb') as f:
+                data = f.read()
+            offsets = [offset for (offset,) in OFFSET.iter_unpack(data[:len(data) - len(data) % 8])]
+        # Trust the index only if its last entry is a complete record
+        end = self._record_end(offsets[-1]) if offsets else FILE_HEADER.size
+        if end is None or (not offsets and size > FILE_HEADER.size) or end < size:
+            offsets = self._scan(size)
+            with open(index_path, 'wb') as f:
+                f.write(b''.join(OFFSET.pack(offset) for offset in offsets))
+        return offsets
+
+    def _record_end(self, offset: int) -> Optional[int]:
+        self.file.seek(offset)
+        data = self.file.read(RECORD_HEADER.size)
+        if len(data) < RECORD_HEADER.size:
+            return None
+        length, _ = RECORD_HEADER.unpack(data)
+        end = offset + RECORD_HEADER.size + length
+        return end if end <= os.fstat(self.file.fileno()).st_size else None
+
+    def _scan(self, size: int) -> List[int]:
+        offsets = []
+        offset = FILE_HEADER.size
+        while offset < size:
+            end = self._record_end(offset)
+            if end is None:
+                # A torn record at the tail, everything before it is usable
+                break
+            offsets.append(offset)
+            offset = end
+        return offsets
+
+    @property
+    def end(self) -> int:
+        """Offset just past the last complete game."""
+        if not self.offsets:
+            return FILE_HEADER.size
+        return self._record_end(self.offsets[-1])
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def __getitem__(self, index: int) -> GameRecord:
+        self.file.seek(self.offsets[index])
+        length, meta_length = RECORD_HEADER.unpack(self.file.read(RECORD_HEADER.size))
+        return GameRecord.decode(self.file.read(length), meta_length)
+
+    def __iter__(self) -> Iterator[GameRecord]:
+        # Sequential reads, no seeking per game
+        self.file.seek(self.offsets[0] if self.offsets else FILE_HEADER.size)
+        for _ in range(len(self.offsets)):
+            length, meta_length = RECORD_HEADER.unpack(self.file.read(RECORD_HEADER.size))
+            yield GameRecord.decode(self.file.read(length), meta_length)
+
+    def close(self) -> None:
+        self.file.close()
+
+    def __enter__(self) -> 'GameReader':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
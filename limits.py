@@ -0,0 +1,12 @@
+"""Search limits, in a module of their own so main4 and engines can share them
+without either importing the other.
+"""
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class Limits:
+    depth: Optional[int] = None
+    # Seconds for the whole search; engines without time control ignore it
+    time: Optional[float] = None
@@ -207,7 +207,8 @@ def play_game(bot1, bot2, verbose=True):
 
         if move_result is None:
             consecutive_passes += 1
-            print(f"{'Black' if current_player == 1 else 'White'} passes.")
+            if verbose:
+                print(f"{'Black' if current_player == 1 else 'White'} passes.")
         else:
             row, col = move_result
             make_move(board, row, col, current_player)
@@ -216,7 +217,8 @@ def play_game(bot1, bot2, verbose=True):
                 print(f"{'Black' if current_player == 1 else 'White'} moves to {row},{col}")
 
         current_player = -current_player
-        print()
+        if verbose:
+            print()
 
     black_count = sum(row.count(1) for row in board)
     white_count = sum(row.count(-1) for row in board)
@@ -147,7 +147,7 @@ def look_ahead(board_state, search_depth, alpha, beta, is_maximizing, player_col
         for row, col in possible_moves:
             future_board = [row[:] for row in board_state]
             make_move(future_board, row, col, player_color)
-            score = look_ahead(future_board, search_depthalpha, beta, False, player_color)
+            score = look_ahead(future_board, search_depth-1, alpha, beta, False, player_color)
             best_score = max(best_score, score)
             alpha = max(alpha, score)
             if beta <= alpha:
@@ -236,7 +236,8 @@ def play_game(bot1, bot2, verbose=True):
 
         if move_result is None:
             consecutive_passes += 1
-            print(f"{'Black' if current_player == 1 else 'White'} passes.")
+            if verbose:
+                print(f"{'Black' if current_player == 1 else 'White'} passes.")
         else:
             row, col = move_result
             make_move(board, row, col, current_player)
@@ -245,7 +246,8 @@ def play_game(bot1, bot2, verbose=True):
                 print(f"{'Black' if current_player == 1 else 'White'} moves to {row},{col}")
 
         current_player = -current_player
-        print()
+        if verbose:
+            print()
 
     black_count = sum(row.count(1) for row in board)
     white_count = sum(row.count(-1) for row in board)
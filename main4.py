@@ -1,9 +1,17 @@
-import multiprocessing as mp
+import os
+import threading
+import time
 from functools import lru_cache
-import edax
-from typing import List, Tuple, Set, Optional
-from dataclasses import dataclass
-from concurrent.futures import ProcessPoolExecutor
+import bitboard
+import profiling
+import solvedstore
+from limits import Limits
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, List, Tuple, Set, Optional
+from dataclasses import asdict, dataclass, field
+# concurrent.futures (and multiprocessing under it), json and edax are imported
+# where they are first needed, so pool workers and short scripts start faster
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
 
 # Using dataclass for better memory efficiency and faster attribute access
 @dataclass(frozen=True)
@@ -19,6 +27,8 @@ class BoardState:
 
 class GameCache:
     _valid_moves_cache = {}
+    # Best or refuting move found at each (board, side to move), tried first next time
+    _best_moves = {}
     # Position weights matrix as a tuple of tuples for immutability
     _position_weights = (
         (120, -20,  20,   5,   5,  20, -20, 120),
@@ -34,6 +44,116 @@ class GameCache:
     @classmethod
     def clear(cls):
         cls._valid_moves_cache.clear()
+        cls._best_moves.clear()
+
+@dataclass
+class SearchStats:
+    nodes: int = 0
+    leaf_evaluations: int = 0
+    cutoffs: int = 0
+    first_move_cutoffs: int = 0
+    depth: int = 0
+    # lru_cache hits and misses per cached function
+    cache_hits: Dict[str, int] = field(default_factory=dict)
+    cache_misses: Dict[str, int] = field(default_factory=dict)
+    # One entry per search iteration and per root move
+    iterations: List[dict] = field(default_factory=list)
+    root_moves: List[dict] = field(default_factory=list)
+    workers: int = 0
+    worker_busy_time: float = 0.0
+    wall_time: float = 0.0
+
+    @property
+    def first_move_cutoff_rate(self) -> float:
+        return self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0
+
+    @property
+    def branching_factor(self) -> float:
+        return self.nodes ** (1 / self.depth) if self.depth and self.nodes else 0.0
+
+    @property
+    def worker_utilization(self) -> float:
+        capacity = self.workers * self.wall_time
+        return self.worker_busy_time / capacity if capacity else 0.0
+
+    def merge(self, other: 'SearchStats') -> None:
+        self.nodes += other.nodes
+        self.leaf_evaluations += other.leaf_evaluations
+        self.cutoffs += other.cutoffs
+        self.first_move_cutoffs += other.first_move_cutoffs
+        for name, hits in other.cache_hits.items():
+            self.cache_hits[name] = self.cache_hits.get(name, 0) + hits
+        for name, misses in other.cache_misses.items():
+            self.cache_misses[name] = self.cache_misses.get(name, 0) + misses
+
+    def to_json(self) -> str:
+        import json
+        data = asdict(self)
+        data.update(first_move_cutoff_rate=self.first_move_cutoff_rate,
+                    branching_factor=self.branching_factor,
+                    worker_utilization=self.worker_utilization)
+        return json.dumps(data)
+
+@dataclass
+class Clock:
+    """A player's remaining game time, with an optional Fischer increment."""
+    remaining: float
+    increment: float = 0.0
+    moves: int = 0
+
+    @property
+    def flagged(self) -> bool:
+        return self.remaining < 0
+
+    def spend(self, seconds: float) -> None:
+        self.remaining -= seconds
+        self.moves += 1
+        if not self.flagged:
+            self.remaining += self.increment
+
+# Set only while a search is being measured, so the disabled cost is one check per node
+_stats: Optional[SearchStats] = None
+
+# Set only while a ponder unit runs: the Ponderer's event, set when the unit is no longer wanted
+_abort: Optional['threading.Event'] = None
+# A pool worker's copy of that event, see _init_ponder_worker
+_ponder_abort: Optional['threading.Event'] = None
+
+class SearchAborted(Exception):
+    """Raised inside a ponder unit whose result is no longer wanted."""
+
+# Processes search_root spreads the root moves over when it isn't given an executor,
+# one per CPU when None. Pool workers of their own (tournament games) set 1 so pools don't nest
+ROOT_WORKERS: Optional[int] = None
+
+# Positions searched in earlier games, see solvedstore.py. The path comes from
+# use_store() or OTHELLO_STORE and every process maps the file for itself
+_store_path: Optional[str] = os.environ.get('OTHELLO_STORE')
+_store: Optional[solvedstore.SolvedStore] = None
+# The exact solver stores only nodes this far from the end, where a lookup beats re-solving
+STORE_MIN_EMPTIES = 8
+# and orders moves only this far from it, where the nodes saved outweigh the move generation
+SOLVE_ORDER_EMPTIES = 7
+
+def use_store(path: Optional[str]) -> None:
+    global _store_path, _store
+    if _store is not None and _store.pid == os.getpid():
+        _store.close()
+    _store_path, _store = path, None
+    # Create the file now, before any pool workers go looking for it
+    _open_store()
+
+def _open_store() -> Optional[solvedstore.SolvedStore]:
+    global _store
+    if _store_path is None:
+        return None
+    if _store is None or _store.pid != os.getpid():
+        _store = solvedstore.SolvedStore(_store_path)
+    return _store
+
+def _side_bitboards(board: tuple, player_color: int) -> Tuple[int, int]:
+    black, white = bitboard.to_bitboards(board)
+    return (black, white) if player_color == 1 else (white, black)
 
 def create_board() -> List[List[int]]:
     board = [[0 for _ in range(8)] for _ in range(8)]
@@ -97,6 +217,37 @@ def make_move(board: List[List[int]], row: int, col: int,
                 
     return new_board
 
+# Corners, edges away from the corners, the centre, the ring around it, then
+# the squares next to the corners: likely good moves first
+MOVE_BATCHES = (
+    0x8100000000000081,
+    0x3C0081818181003C,
+    0x00003C3C3C3C0000,
+    0x003C424242423C00,
+    0x4281000000008142,
+    0x0042000000004200,
+)
+# A BoardState key is about 1 KB, so this keeps the table near 64 MB per process
+BEST_MOVES_LIMIT = 1 << 16
+
+def pick_moves(board_state: BoardState, player_color: int,
+               first: Optional[Tuple[int, int]] = None) -> Iterator[Tuple[int, int]]:
+    """Yields the legal moves lazily, `first` (a remembered best move) before any are generated.
+
+    A search that cuts off on the first move never pays for the rest.
+    """
+    player, opponent = _side_bitboards(board_state.board, player_color)
+    tried = 0
+    if first is not None:
+        square = first[0] * 8 + first[1]
+        if not (player | opponent) >> square & 1 and bitboard.flips(player, opponent, square):
+            yield first
+            tried = 1 << square
+    remaining = bitboard.legal_moves(player, opponent) & ~tried
+    for batch in MOVE_BATCHES:
+        for square in bitboard.iter_bits(remaining & batch):
+            yield divmod(square, 8)
+
 @lru_cache(maxsize=10000)
 def evaluate_position(board_state: BoardState, player_color: int) -> int:
     board = board_state.board
@@ -121,58 +272,231 @@ def evaluate_position(board_state: BoardState, player_color: int) -> int:
 
 def look_ahead_worker(args) -> int:
     board_state, depth, alpha, beta, is_maximizing, player_color = args
-    return _look_ahead(board_state, depth, alpha, beta, is_maximizing, player_color)
+    current_color = player_color if is_maximizing else -player_color
+    # Stored scores are from the side to move's point of view
+    sign = 1 if is_maximizing else -1
+    exact = depth >= sum(row.count(0) for row in board_state.board)
+    store = _open_store()
+    # Only a full-window score is the position's true value at its depth
+    if store is not None and alpha == float('-inf') and beta == float('inf'):
+        stored_depth = solvedstore.EXACT_DEPTH if exact else depth
+        player, opponent = _side_bitboards(board_state.board, current_color)
+        entry = store.get(player, opponent)
+        if entry is not None and entry.bound == solvedstore.EXACT and entry.depth == stored_depth:
+            return sign * entry.score
+    else:
+        store = None
+
+    if exact:
+        # Deep enough to see the end of the game, so solve it exactly instead, within the
+        # window as the side to move sees it so null-window probes cut off as early
+        low, high = (alpha, beta) if is_maximizing else (-beta, -alpha)
+        score = sign * solve(board_state, current_color, max(low, -64), min(high, 64))
+    else:
+        score = _look_ahead(board_state, depth, alpha, beta, is_maximizing, player_color)
+    if store is not None:
+        store.put(player, opponent, stored_depth, solvedstore.EXACT, sign * score)
+    return score
+
+def solve(board_state: BoardState, player_color: int, alpha: float = -64, beta: float = 64) -> int:
+    """Exact final disc difference for player_color to move, empties going to the winner.
+
+    Fail-soft like _look_ahead: a score at or below alpha, or at or above beta,
+    is only a bound on the true one.
+    """
+    _open_store()
+    player, opponent = _side_bitboards(board_state.board, player_color)
+    return _solve(player, opponent, alpha, beta)
+
+def _solve(player: int, opponent: int, alpha: int, beta: int) -> int:
+    stats = _stats
+    if stats is not None:
+        stats.nodes += 1
+    if _abort is not None and _abort.is_set():
+        raise SearchAborted
+
+    moves = bitboard.legal_moves(player, opponent)
+    if not moves:
+        if not bitboard.legal_moves(opponent, player):
+            if stats is not None:
+                stats.leaf_evaluations += 1
+            player_count = bin(player).count('1')
+            opponent_count = bin(opponent).count('1')
+            empties = 64 - player_count - opponent_count
+            if player_count > opponent_count:
+                return player_count - opponent_count + empties
+            if player_count < opponent_count:
+                return player_count - opponent_count - empties
+            return 0
+        return -_solve(opponent, player, -beta, -alpha)
+
+    empties = 64 - bin(player | opponent).count('1')
+    store = _store
+    stored = store is not None and empties >= STORE_MIN_EMPTIES
+    hint = None
+    if stored:
+        entry = store.get(player, opponent)
+        if entry is not None and entry.depth == solvedstore.EXACT_DEPTH and (
+                entry.bound == solvedstore.EXACT
+                or (entry.bound == solvedstore.LOWER and entry.score >= beta)
+                or (entry.bound == solvedstore.UPPER and entry.score <= alpha)):
+            return entry.score
+        if entry is not None:
+            hint = entry.move
+    alpha_start = alpha
+
+    if empties >= SOLVE_ORDER_EMPTIES:
+        hint = GameCache._best_moves.get((player, opponent), hint)
+        children = _solve_order(player, opponent, moves, hint)
+    else:
+        # Near the end ordering costs more than the nodes it saves
+        children = ((square, bitboard.flips(player, opponent, square)) for square in bitboard.iter_bits(moves))
+    best_score = -65
+    best_square = None
+    for index, (square, flipped) in enumerate(children):
+        score = -_solve(opponent & ~flipped, player | flipped | (1 << square), -beta, -alpha)
+        if score > best_score:
+            best_score = score
+            best_square = square
+            if score > alpha:
+                alpha = score
+                if alpha >= beta:
+                    if stats is not None:
+                        stats.cutoffs += 1
+                        stats.first_move_cutoffs += index == 0
+                    break
+    if best_score > alpha_start and empties >= SOLVE_ORDER_EMPTIES:
+        # Best or refuting move, tried first when a later search comes back here
+        if len(GameCache._best_moves) >= BEST_MOVES_LIMIT:
+            GameCache._best_moves.clear()
+        GameCache._best_moves[player, opponent] = best_square
+    if stored:
+        if best_score <= alpha_start:
+            # Failed low: every move is at most this good and none is known to be best
+            store.put(player, opponent, solvedstore.EXACT_DEPTH, solvedstore.UPPER, best_score)
+        else:
+            bound = solvedstore.LOWER if best_score >= beta else solvedstore.EXACT
+            store.put(player, opponent, solvedstore.EXACT_DEPTH, bound, best_score, best_square)
+    return best_score
+
+def _solve_order(player: int, opponent: int, moves: int,
+                 first: Optional[int]) -> List[Tuple[int, int]]:
+    """(square, flipped) for each move, the remembered best first, then fastest first.
+
+    Leaving the opponent the fewest replies keeps its subtree small and finds
+    the cutoffs that end the search of a node soonest.
+    """
+    children = []
+    for square in bitboard.iter_bits(moves):
+        flipped = bitboard.flips(player, opponent, square)
+        replies = bin(bitboard.legal_moves(opponent & ~flipped, player | flipped | (1 << square))).count('1')
+        children.append((square != first, replies, square, flipped))
+    children.sort()
+    return [(square, flipped) for _, _, square, flipped in children]
+
+def _cache_infos() -> Dict[str, tuple]:
+    return {function.__name__: function.cache_info()
+            for function in (_look_ahead, evaluate_position, get_valid_moves)}
+
+def look_ahead_stats_worker(args) -> Tuple[int, SearchStats, float]:
+    global _stats
+    _stats = SearchStats()
+    before = _cache_infos()
+    start = time.perf_counter()
+    try:
+        score = look_ahead_worker(args)
+    finally:
+        elapsed = time.perf_counter() - start
+        stats, _stats = _stats, None
+    for name, info in _cache_infos().items():
+        stats.cache_hits[name] = info.hits - before[name].hits
+        stats.cache_misses[name] = info.misses - before[name].misses
+    return score, stats, elapsed
 
 @lru_cache(maxsize=10000)
 def _look_ahead(board_state: BoardState, depth: int, alpha: float, beta: float,
                 is_maximizing: bool, player_color: int) -> int:
+    stats = _stats
+    if stats is not None:
+        stats.nodes += 1
+    if _abort is not None and _abort.is_set():
+        raise SearchAborted
+
     if depth == 0:
+        if stats is not None:
+            stats.leaf_evaluations += 1
         return evaluate_position(board_state, player_color)
 
     current_color = player_color if is_maximizing else -player_color
-    possible_moves = get_valid_moves(board_state, current_color)
-
-    if not possible_moves:
-        return evaluate_position(board_state, player_color)
+    key = (board_state, current_color)
+    best_move = None
 
     if is_maximizing:
         best_score = float('-inf')
-        for row, col in possible_moves:
+        for index, (row, col) in enumerate(pick_moves(board_state, current_color,
+                                                      GameCache._best_moves.get(key))):
             new_board = make_move(board_state.to_list(), row, col, current_color)
             new_board_state = BoardState.from_list(new_board)
             
             score = _look_ahead(new_board_state, depth-1, alpha, beta, False, 
                               player_color)
-            best_score = max(best_score, score)
+            if score > best_score:
+                best_score, best_move = score, (row, col)
             alpha = max(alpha, score)
             if beta <= alpha:
+                if stats is not None:
+                    stats.cutoffs += 1
+                    stats.first_move_cutoffs += index == 0
                 break
-        return best_score
     else:
-        worst_score = float('inf')
-        for row, col in possible_moves:
+        best_score = float('inf')
+        for index, (row, col) in enumerate(pick_moves(board_state, current_color,
+                                                      GameCache._best_moves.get(key))):
             new_board = make_move(board_state.to_list(), row, col, current_color)
             new_board_state = BoardState.from_list(new_board)
             
             score = _look_ahead(new_board_state, depth-1, alpha, beta, True, 
                               player_color)
-            worst_score = min(worst_score, score)
+            if score < best_score:
+                best_score, best_move = score, (row, col)
             beta = min(beta, score)
             if beta <= alpha:
+                if stats is not None:
+                    stats.cutoffs += 1
+                    stats.first_move_cutoffs += index == 0
                 break
-        return worst_score
 
-def move(board_state: List[List[int]], player_color: int) -> Optional[Tuple[int, int]]:
-    board_state_immutable = BoardState.from_list(board_state)
-    possible_moves = get_valid_moves(board_state_immutable, player_color)
+    if best_move is None:
+        # No moves: the position is scored as it stands
+        if stats is not None:
+            stats.leaf_evaluations += 1
+        return evaluate_position(board_state, player_color)
+    if len(GameCache._best_moves) >= BEST_MOVES_LIMIT:
+        GameCache._best_moves.clear()
+    GameCache._best_moves[key] = best_move
+    return best_score
 
-    if not possible_moves:
-        return None
+def _init_ponder_worker(abort) -> None:
+    global _ponder_abort
+    _ponder_abort = abort
+
+def ponder_worker(args) -> int:
+    """look_ahead_worker that gives up with SearchAborted once the pool's abort event is set."""
+    global _abort
+    _abort = _ponder_abort
+    try:
+        return look_ahead_worker(args)
+    finally:
+        _abort = None
 
+def split_root(board_state: List[List[int]], player_color: int,
+               search_depth: Optional[int] = None) -> Tuple[List[Tuple[int, int]], list, int]:
+    """The root moves, a look_ahead_worker argument tuple for each, and the depth searched."""
+    possible_moves = list(get_valid_moves(BoardState.from_list(board_state), player_color))
     empty_spaces = sum(row.count(0) for row in board_state)
-    search_depth = 40 if empty_spaces <= 10 else 6
+    if search_depth is None:
+        search_depth = 40 if empty_spaces <= 10 else 6
 
-    # Prepare arguments for parallel processing
     move_args = []
     for row, col in possible_moves:
         future_board = make_move(board_state, row, col, player_color)
@@ -181,10 +505,51 @@ def move(board_state: List[List[int]], player_color: int) -> Optional[Tuple[int,
             future_board_state, search_depth-1, float('-inf'), float('inf'), 
             False, player_color
         ))
+    return possible_moves, move_args, search_depth
+
+def search_root(board_state: List[List[int]], player_color: int,
+                search_depth: Optional[int] = None,
+                stats: Optional[SearchStats] = None,
+                executor: Optional['Executor'] = None) -> Tuple[Optional[Tuple[int, int]], float]:
+    """Returns the best move and its score, or (None, 0) when the player must pass."""
+    start = time.perf_counter()
+    possible_moves, move_args, search_depth = split_root(board_state, player_color, search_depth)
+
+    if not possible_moves:
+        return None, 0
+
+    empty_spaces = sum(row.count(0) for row in board_state)
+    store = _open_store()
+    if store is not None:
+        # Positions met in earlier games come straight from the store
+        stored_depth = solvedstore.EXACT_DEPTH if search_depth >= empty_spaces else search_depth
+        player, opponent = _side_bitboards(board_state, player_color)
+        entry = store.get(player, opponent)
+        if (entry is not None and entry.bound == solvedstore.EXACT and entry.depth == stored_depth
+                and entry.move is not None):
+            best_move = divmod(entry.move, 8)
+            if stats is not None:
+                stats.depth = min(search_depth, empty_spaces)
+                stats.iterations.append({'depth': search_depth, 'time': time.perf_counter() - start,
+                                         'nodes': 0, 'best_move': list(best_move), 'stored': True})
+            return best_move, entry.score
 
     # Use ProcessPoolExecutor for parallel processing
-    with ProcessPoolExecutor(max_workers=mp.cpu_count()) as executor:
-        scores = list(executor.map(look_ahead_worker, move_args))
+    worker = look_ahead_worker if stats is None else look_ahead_stats_worker
+    workers = ROOT_WORKERS or os.cpu_count() or 1
+    if executor is None and workers == 1:
+        results = list(map(worker, move_args))
+    elif executor is None:
+        from concurrent.futures import ProcessPoolExecutor
+        initializer, initargs = profiling.worker_initializer()
+        with ProcessPoolExecutor(max_workers=workers, initializer=initializer,
+                                 initargs=initargs) as executor:
+            results = list(executor.map(worker, move_args))
+    else:
+        # A long-lived pool keeps its workers' caches warm between searches
+        workers = getattr(executor, '_max_workers', workers)
+        results = list(executor.map(worker, move_args))
+    scores = results if stats is None else [score for score, _, _ in results]
 
     # Find the best move
     best_score = float('-inf')
@@ -194,8 +559,317 @@ def move(board_state: List[List[int]], player_color: int) -> Optional[Tuple[int,
             best_score = score
             best_move = (row, col)
 
+    if stats is not None:
+        wall_time = time.perf_counter() - start
+        nodes_before = stats.nodes
+        stats.nodes += 1
+        for (row, col), (score, worker_stats, elapsed) in zip(possible_moves, results):
+            stats.merge(worker_stats)
+            stats.worker_busy_time += elapsed
+            stats.root_moves.append({'move': [row, col], 'score': score,
+                                     'nodes': worker_stats.nodes, 'time': elapsed})
+        stats.depth = min(search_depth, empty_spaces)
+        stats.workers = workers
+        stats.wall_time += wall_time
+        stats.iterations.append({'depth': search_depth, 'time': wall_time,
+                                 'nodes': stats.nodes - nodes_before, 'best_move': list(best_move)})
+    if store is not None:
+        store.put(player, opponent, stored_depth, solvedstore.EXACT, best_score,
+                  best_move[0] * 8 + best_move[1])
+
+    return best_move, best_score
+
+def search_iterative(board_state: List[List[int]], player_color: int,
+                     time_limit: Optional[float] = None, max_depth: int = 6,
+                     executor: Optional['Executor'] = None,
+                     stats: Optional[SearchStats] = None) -> Tuple[Optional[Tuple[int, int]], float, int]:
+    """Deepens one ply at a time while the next iteration is expected to fit in time_limit.
+
+    Returns (move, score, depth reached). Endgames within reach are solved exactly.
+    """
+    start = time.perf_counter()
+    empty_spaces = sum(row.count(0) for row in board_state)
+    if empty_spaces <= 10:
+        best_move, score = search_root(board_state, player_color, stats=stats, executor=executor)
+        return best_move, score, empty_spaces
+
+    best_move, score, depth = None, 0, 0
+    last_time = 0.0
+    for depth in range(1, max_depth + 1):
+        elapsed = time.perf_counter() - start
+        # Each ply costs a few times the previous one
+        if depth > 1 and time_limit is not None and elapsed + last_time * 4 > time_limit:
+            depth -= 1
+            break
+        iteration_start = time.perf_counter()
+        best_move, score = search_root(board_state, player_color, depth, stats=stats,
+                                       executor=executor)
+        last_time = time.perf_counter() - iteration_start
+        if best_move is None:
+            break
+    return best_move, score, depth
+
+@dataclass
+class AnalysisLine:
+    move: Tuple[int, int]
+    score: float
+    # 'exact', or 'upper' for a move only shown to score at most this, outside the top n_pv
+    bound: str
+    # The moves from this one on, None for a pass
+    pv: List[Optional[Tuple[int, int]]] = field(default_factory=list)
+    depth: int = 0
+
+def _solve_pv(player: int, opponent: int, score: int) -> List[Optional[Tuple[int, int]]]:
+    pv = []
+    while True:
+        moves = bitboard.legal_moves(player, opponent)
+        if not moves:
+            if not bitboard.legal_moves(opponent, player):
+                return pv
+            pv.append(None)
+            player, opponent, score = opponent, player, -score
+            continue
+        for square in bitboard.iter_bits(moves):
+            flipped = bitboard.flips(player, opponent, square)
+            child = (opponent & ~flipped, player | flipped | (1 << square))
+            # A window around the known score is enough to tell whether this move reaches it
+            if -_solve(child[0], child[1], -score - 1, -score + 1) == score:
+                break
+        pv.append(divmod(square, 8))
+        player, opponent = child
+        score = -score
+
+def principal_variation(board_state: BoardState, depth: int, is_maximizing: bool,
+                        player_color: int, score: float) -> List[Optional[Tuple[int, int]]]:
+    """The line a full-window search of board_state follows to reach score."""
+    current_color = player_color if is_maximizing else -player_color
+    if depth >= sum(row.count(0) for row in board_state.board):
+        player, opponent = _side_bitboards(board_state.board, current_color)
+        return _solve_pv(player, opponent, score if is_maximizing else -score)
+    pv = []
+    while depth > 0:
+        current_color = player_color if is_maximizing else -player_color
+        possible_moves = sorted(get_valid_moves(board_state, current_color))
+        if not possible_moves:
+            break
+        for row, col in possible_moves:
+            child = BoardState.from_list(make_move(board_state.to_list(), row, col, current_color))
+            if _look_ahead(child, depth - 1, score - 1, score + 1, not is_maximizing,
+                           player_color) == score:
+                break
+        pv.append((row, col))
+        board_state, depth, is_maximizing = child, depth - 1, not is_maximizing
+    return pv
+
+def pv_worker(args) -> Tuple[int, List[Optional[Tuple[int, int]]]]:
+    score = look_ahead_worker(args)
+    board_state, depth, _, _, is_maximizing, player_color = args
+    return score, principal_variation(board_state, depth, is_maximizing, player_color, score)
+
+def _analyze_depth(board_state: List[List[int]], player_color: int, n_pv: int, depth: int,
+                   executor: 'Executor', order: Dict[Tuple[int, int], float]) -> List[AnalysisLine]:
+    possible_moves, move_args, depth = split_root(board_state, player_color, depth)
+    reached = min(depth, sum(row.count(0) for row in board_state))
+    by_move = dict(zip(possible_moves, move_args))
+    if not order:
+        order = {(row, col): evaluate_position(BoardState.from_list(
+                     make_move(board_state, row, col, player_color)), player_color)
+                 for row, col in possible_moves}
+    ranked = sorted(possible_moves, key=lambda played: -order[played])
+    lines: Dict[Tuple[int, int], AnalysisLine] = {}
+
+    def search_exact(moves):
+        for played, (score, pv) in zip(moves, executor.map(pv_worker, [by_move[m] for m in moves])):
+            lines[played] = AnalysisLine(played, score, 'exact', [played] + pv, reached)
+
+    # The likeliest n_pv moves get full windows, all at once across the pool
+    search_exact(ranked[:n_pv])
+    rest = ranked[n_pv:]
+    if rest:
+        # The others only have to be shown no better than the n_pv-th best so far
+        threshold = sorted((line.score for line in lines.values()), reverse=True)[n_pv - 1]
+        window_args = [by_move[played][:2] + (threshold, threshold + 1) + by_move[played][4:]
+                       for played in rest]
+        better = []
+        for played, score in zip(rest, executor.map(look_ahead_worker, window_args)):
+            if score <= threshold:
+                lines[played] = AnalysisLine(played, score, 'upper', [played], reached)
+            else:
+                better.append(played)
+        # Moves that failed high get a full search. The bounds already found stay
+        # valid, since the n_pv-th best score can only have gone up
+        search_exact(better)
+    exact = sorted((line for line in lines.values() if line.bound == 'exact'), key=lambda line: -line.score)
+    bounded = sorted((line for line in lines.values() if line.bound != 'exact'), key=lambda line: -line.score)
+    return exact + bounded
+
+def analyze(board_state: List[List[int]], player_color: int, n_pv: Optional[int] = None,
+            limits: Optional[Limits] = None,
+            executor: Optional['Executor'] = None) -> List[AnalysisLine]:
+    """Ranked lines with scores and principal variations for the side to move.
+
+    The best n_pv moves (all of them by default) get exact scores and full PVs.
+    The rest are only shown to be worse, which takes far less search. With a
+    time limit the search deepens one ply at a time, ordering each iteration by
+    the last one, and returns the deepest analysis that finished.
+    """
+    limits = limits or Limits()
+    possible_moves = get_valid_moves(BoardState.from_list(board_state), player_color)
+    if not possible_moves:
+        return []
+    n_pv = len(possible_moves) if n_pv is None else max(1, min(n_pv, len(possible_moves)))
+    empty_spaces = sum(row.count(0) for row in board_state)
+    max_depth = limits.depth or (40 if empty_spaces <= 10 else 6)
+    owned = executor is None
+    if owned:
+        # One pool for every iteration, so the workers' caches carry over
+        from concurrent.futures import ProcessPoolExecutor
+        executor = ProcessPoolExecutor(max_workers=os.cpu_count())
+    try:
+        if limits.time is None:
+            return _analyze_depth(board_state, player_color, n_pv, max_depth, executor, {})
+        start = time.perf_counter()
+        lines: List[AnalysisLine] = []
+        last_time = 0.0
+        for depth in range(1, min(max_depth, empty_spaces) + 1):
+            elapsed = time.perf_counter() - start
+            if lines and elapsed + last_time * 4 > limits.time:
+                break
+            iteration_start = time.perf_counter()
+            order = {line.move: line.score for line in lines}
+            lines = _analyze_depth(board_state, player_color, n_pv, depth, executor, order)
+            last_time = time.perf_counter() - iteration_start
+        return lines
+    finally:
+        if owned:
+            executor.shutdown()
+
+def move(board_state: List[List[int]], player_color: int,
+         stats: Optional[SearchStats] = None) -> Optional[Tuple[int, int]]:
+    # OTHELLO_STATS=path appends one JSON line of search statistics per move
+    stats_path = os.environ.get('OTHELLO_STATS')
+    if stats is None and stats_path:
+        stats = SearchStats()
+    # OTHELLO_PROFILE=dir (or profiling.enable) profiles each move, workers included
+    with profiling.profile_move():
+        best_move = search_root(board_state, player_color, stats=stats)[0]
+    if stats_path:
+        with open(stats_path, 'a') as f:
+            f.write(stats.to_json() + "\n")
     return best_move
 
+class Ponderer:
+    """A bot for one colour that searches its replies on the opponent's time.
+
+    Pass on_turn and on_move to play_game. While the opponent thinks, our best
+    reply to each opponent move is searched, likeliest first, on a pool that
+    lives for the whole game so its caches stay warm. When the opponent plays
+    a move that was already searched, the bot answers instantly.
+    """
+
+    def __init__(self, color: int, search_depth: Optional[int] = None,
+                 workers: Optional[int] = None):
+        self.color = color
+        self.search_depth = search_depth
+        import multiprocessing as mp
+        from concurrent.futures import ProcessPoolExecutor
+        # Set to make ponder units that are already running give up
+        self._abort = mp.Event()
+        self.executor = ProcessPoolExecutor(max_workers=workers or os.cpu_count(),
+                                            initializer=_init_ponder_worker, initargs=(self._abort,))
+        self.results: Dict[BoardState, Tuple[Optional[Tuple[int, int]], float]] = {}
+        self.hits = 0
+        self.misses = 0
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._wanted: Optional[BoardState] = None
+
+    def on_turn(self, board_state: List[List[int]], player_color: int) -> None:
+        if player_color == -self.color:
+            self.start(board_state)
+
+    def on_move(self, board_state: List[List[int]], player_color: int,
+                played: Optional[Tuple[int, int]]) -> None:
+        if player_color == -self.color:
+            self.stop(board_state)
+
+    def start(self, board_state: List[List[int]]) -> None:
+        """Starts pondering a position with the opponent to move."""
+        self.stop()
+        self.results.clear()
+        opponent = -self.color
+        replies = sorted(get_valid_moves(BoardState.from_list(board_state), opponent))
+        positions = [make_move(board_state, row, col, opponent) for row, col in replies]
+        # Likeliest replies first, by the opponent's static evaluation
+        positions.sort(key=lambda board: -evaluate_position(BoardState.from_list(board), opponent))
+        self._stop.clear()
+        self._abort.clear()
+        self._wanted = None
+        self._thread = threading.Thread(target=self._ponder, args=(positions or [board_state],),
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self, board_state: Optional[List[List[int]]] = None) -> None:
+        """Stops pondering, but finishes the search of board_state if it is under way."""
+        if self._thread is None:
+            return
+        self._wanted = BoardState.from_list(board_state) if board_state is not None else None
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def _ponder(self, positions: List[List[List[int]]]) -> None:
+        for board in positions:
+            if self._stop.is_set():
+                return
+            key = BoardState.from_list(board)
+            result = self._search(board, key)
+            if result is not None:
+                self.results[key] = result
+
+    def _search(self, board: List[List[int]],
+                key: BoardState) -> Optional[Tuple[Optional[Tuple[int, int]], float]]:
+        from concurrent.futures import FIRST_COMPLETED, wait
+        # search_root split into units so a reply that wasn't played can be dropped midway
+        possible_moves, move_args, _ = split_root(board, self.color, self.search_depth)
+        if not possible_moves:
+            return None, 0
+        futures = [self.executor.submit(ponder_worker, args) for args in move_args]
+        pending = set(futures)
+        while pending:
+            _, pending = wait(pending, timeout=0.05, return_when=FIRST_COMPLETED)
+            if pending and self._stop.is_set() and self._wanted != key:
+                # Queued units are cancelled, running ones stop at their next node,
+                # so the real search doesn't wait behind them
+                self._abort.set()
+                for future in pending:
+                    future.cancel()
+                return None
+        best_move, best_score = None, float('-inf')
+        for played, future in zip(possible_moves, futures):
+            if future.result() > best_score:
+                best_move, best_score = played, future.result()
+        return best_move, best_score
+
+    def __call__(self, board_state: List[List[int]], player_color: int) -> Optional[Tuple[int, int]]:
+        self.stop(board_state)
+        result = self.results.get(BoardState.from_list(board_state))
+        if result is not None:
+            self.hits += 1
+            return result[0]
+        self.misses += 1
+        return search_root(board_state, player_color, self.search_depth, executor=self.executor)[0]
+
+    def close(self) -> None:
+        self.stop()
+        self.executor.shutdown()
+
+    def __enter__(self) -> 'Ponderer':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
 def player(board_state: List[List[int]], player_color: int) -> Optional[Tuple[int, int]]:
     board_state_immutable = BoardState.from_list(board_state)
     valid_moves = get_valid_moves(board_state_immutable, player_color)
@@ -205,6 +879,7 @@ def player(board_state: List[List[int]], player_color: int) -> Optional[Tuple[in
     if not valid_moves:
         return None
     
+    import edax
     while True:
         try:
             x, y = edax.get_move(board_state, player_color, Edax)
@@ -214,9 +889,18 @@ def player(board_state: List[List[int]], player_color: int) -> Optional[Tuple[in
         except ValueError:
             print("Invalid input. Enter numeric coordinates between 0 and 7.")
 
-def play_game(bot1, bot2, verbose: bool = True) -> Tuple[int, int]:
-    board = create_board()
-    current_player = 1
+def play_game(bot1, bot2, verbose: bool = True,
+              board: Optional[List[List[int]]] = None,
+              current_player: int = 1,
+              on_turn: Optional[Callable[[List[List[int]], int], None]] = None,
+              on_move: Optional[Callable[[List[List[int]], int, Optional[Tuple[int, int]]], None]] = None,
+              clocks: Optional[Dict[int, Clock]] = None) -> Tuple[int, int]:
+    # Openings other than the standard start can be supplied by the caller.
+    # on_turn(board, color) runs before a player is asked for its move and
+    # on_move(new board, color, move) once the move has been made, e.g. to ponder.
+    # With clocks ({1: black, -1: white}) each move's time is charged to the
+    # mover, and running out loses the game 64-0.
+    board = create_board() if board is None else [row[:] for row in board]
     consecutive_passes = 0
     GameCache.clear()  # Clear cache at start of new game
 
@@ -225,21 +909,35 @@ def play_game(bot1, bot2, verbose: bool = True) -> Tuple[int, int]:
             print_board(board)
             print(f"{'Black' if current_player == 1 else 'White'} to move")
 
+        if on_turn is not None:
+            on_turn(board, current_player)
         current_bot = bot1 if current_player == 1 else bot2
+        move_start = time.perf_counter()
         move_result = current_bot(board, current_player)
+        if clocks is not None:
+            clock = clocks[current_player]
+            clock.spend(time.perf_counter() - move_start)
+            if clock.flagged:
+                if verbose:
+                    print(f"{'Black' if current_player == 1 else 'White'} ran out of time.")
+                return (0, 64) if current_player == 1 else (64, 0)
 
         if move_result is None:
             consecutive_passes += 1
-            print(f"{'Black' if current_player == 1 else 'White'} passes.")
+            if verbose:
+                print(f"{'Black' if current_player == 1 else 'White'} passes.")
         else:
             row, col = move_result
             board = make_move(board, row, col, current_player)
             consecutive_passes = 0
             if verbose:
                 print(f"{'Black' if current_player == 1 else 'White'} moves to {row},{col}")
+        if on_move is not None:
+            on_move(board, current_player, move_result)
 
         current_player = -current_player
-        print()
+        if verbose:
+            print()
 
     black_count = sum(row.count(1) for row in board)
     white_count = sum(row.count(-1) for row in board)
@@ -252,8 +950,12 @@ def play_game(bot1, bot2, verbose: bool = True) -> Tuple[int, int]:
     return black_count, white_count
 
 if __name__ == "__main__":
+    import edax
     Edax = edax.start_edax()
     try:
-        black_score, white_score = play_game(player, move, verbose=True)
+        # The bot ponders while Edax or the human picks a move
+        with Ponderer(-1) as bot:
+            black_score, white_score = play_game(player, bot, verbose=True,
+                                                 on_turn=bot.on_turn, on_move=bot.on_move)
     finally:
         edax.close_edax(Edax)
\ No newline at end of file
@@ -0,0 +1,288 @@
+"""Monte Carlo tree search with batched NumPy playouts.
+
+An alternative to main4's alpha-beta. Each round selects `batch` leaves from
+the tree. Pending leaves carry a virtual loss, so one round's selections spread
+out instead of piling onto the same line. The round then plays `rollouts`
+random games from each leaf together, as one vectorised batch of uint64
+bitboards. Across processes the search is root parallel: each worker grows
+its own tree from a different seed for the time limit, and the root visit
+counts are summed. Each process keeps its tree between moves, and when the
+new position is a child or grandchild of the old root, that subtree is reused.
+
+    engine = engines.create('mcts:time=0.5,workers=4')
+    python tournament.py -e mcts:time=0.5 -e alphabeta:depth=4
+"""
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+import bitboard
+import engines
+
+PASS = 64
+
+_NOT_A = np.uint64(bitboard.NOT_A_FILE)
+_NOT_H = np.uint64(bitboard.NOT_H_FILE)
+_U = {n: np.uint64(n) for n in (1, 2, 4, 7, 8, 9, 56)}
+_DIRECTIONS = range(8)
+
+
+def _shift(x: np.ndarray, direction: int) -> np.ndarray:
+    if direction == 0:
+        return (x << _U[1]) & _NOT_A
+    if direction == 1:
+        return (x >> _U[1]) & _NOT_H
+    if direction == 2:
+        return x << _U[8]
+    if direction == 3:
+        return x >> _U[8]
+    if direction == 4:
+        return (x << _U[9]) & _NOT_A
+    if direction == 5:
+        return (x << _U[7]) & _NOT_H
+    if direction == 6:
+        return (x >> _U[7]) & _NOT_A
+    return (x >> _U[9]) & _NOT_H
+
+
+def popcount(x: np.ndarray) -> np.ndarray:
+    # SWAR, so it works on NumPy versions without bitwise_count
+    x = x - ((x >> _U[1]) & np.uint64(0x5555555555555555))
+    x = (x & np.uint64(0x3333333333333333)) + ((x >> _U[2]) & np.uint64(0x3333333333333333))
+    x = (x + (x >> _U[4])) & np.uint64(0x0F0F0F0F0F0F0F0F)
+    return ((x * np.uint64(0x0101010101010101)) >> _U[56]).astype(np.int64)
+
+
+def legal_moves(player: np.ndarray, opponent: np.ndarray) -> np.ndarray:
+    empty = ~(player | opponent)
+    moves = np.zeros_like(player)
+    for direction in _DIRECTIONS:
+        run = _shift(player, direction) & opponent
+        for _ in range(5):
+            run |= _shift(run, direction) & opponent
+        moves |= _shift(run, direction) & empty
+    return moves
+
+
+def flips(player: np.ndarray, opponent: np.ndarray, move: np.ndarray) -> np.ndarray:
+    flipped = np.zeros_like(player)
+    for direction in _DIRECTIONS:
+        run = _shift(move, direction) & opponent
+        for _ in range(5):
+            run |= _shift(run, direction) & opponent
+        # The run is contiguous from the move, so only the square past its end can be ours
+        capped = (_shift(run, direction) & player) != 0
+        flipped |= np.where(capped, run, np.uint64(0))
+    return flipped
+
+
+def playouts(player: np.ndarray, opponent: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """Plays every game to the end at random; +1/0/-1 for a win/draw/loss of the side to move."""
+    player, opponent = player.copy(), opponent.copy()
+    sign = np.ones(len(player), dtype=np.int64)
+    passes = np.zeros(len(player), dtype=np.int64)
+    active = np.ones(len(player), dtype=bool)
+    while active.any():
+        moves = legal_moves(player, opponent)
+        moving = active & (moves != 0)
+        passing = active & (moves == 0)
+        passes = np.where(moving, 0, passes + passing)
+        over = passing & (passes >= 2)
+        active &= ~over
+        passing &= ~over
+
+        # Pick the k-th set bit of each move mask, k uniform over the legal moves
+        count = popcount(moves)
+        k = (rng.random(len(moves)) * count).astype(np.int64)
+        picked = moves.copy()
+        for i in range(int(k.max(initial=0))):
+            picked = np.where(k > i, picked & (picked - _U[1]), picked)
+        picked &= ~picked + _U[1]
+        flipped = flips(player, opponent, picked)
+        moved_player = player | flipped | picked
+        moved_opponent = opponent & ~flipped
+
+        # Both a move and a pass hand the turn over
+        turn = moving | passing
+        player, opponent = (np.where(moving, moved_opponent, np.where(passing, opponent, player)),
+                            np.where(moving, moved_player, np.where(passing, player, opponent)))
+        sign = np.where(turn, -sign, sign)
+    return np.sign(popcount(player) - popcount(opponent)) * sign
+
+
+class Node:
+    __slots__ = ('player', 'opponent', 'untried', 'children', 'visits', 'value', 'virtual')
+
+    def __init__(self, player: int, opponent: int):
+        self.player = player
+        self.opponent = opponent
+        moves = list(bitboard.iter_bits(bitboard.legal_moves(player, opponent)))
+        if not moves and bitboard.legal_moves(opponent, player):
+            moves = [PASS]
+        self.untried = moves
+        self.children: Dict[int, 'Node'] = {}
+        self.visits = 0
+        # Wins minus losses for the player who moved into this node
+        self.value = 0.0
+        self.virtual = 0
+
+    def play(self, square: int) -> 'Node':
+        if square == PASS:
+            return Node(self.opponent, self.player)
+        flipped = bitboard.flips(self.player, self.opponent, square)
+        return Node(self.opponent & ~flipped, self.player | flipped | (1 << square))
+
+    def select(self, c: float) -> Tuple[int, 'Node']:
+        log_visits = math.log(self.visits + self.virtual + 1)
+        best, best_score = None, -math.inf
+        for square, child in self.children.items():
+            visits = child.visits + child.virtual
+            # A pending playout counts as a loss until its result is in
+            score = (child.value - child.virtual) / visits + c * math.sqrt(log_visits / visits)
+            if score > best_score:
+                best, best_score = square, score
+        return best, self.children[best]
+
+    def find(self, player: int, opponent: int, plies: int = 2) -> Optional['Node']:
+        if (self.player, self.opponent) == (player, opponent):
+            return self
+        if plies:
+            for child in self.children.values():
+                found = child.find(player, opponent, plies - 1)
+                if found is not None:
+                    return found
+        return None
+
+
+class Tree:
+    def __init__(self, c: float = 1.4, batch: int = 32, rollouts: int = 8, seed: Optional[int] = None):
+        self.c = c
+        self.batch = batch
+        self.rollouts = rollouts
+        self.rng = np.random.default_rng(seed)
+        self.root: Optional[Node] = None
+        self.playouts = 0
+        self.max_depth = 0
+
+    def set_position(self, player: int, opponent: int) -> None:
+        found = self.root.find(player, opponent) if self.root is not None else None
+        self.root = found or Node(player, opponent)
+
+    def _descend(self) -> List[Node]:
+        path = [self.root]
+        node = self.root
+        while not node.untried and node.children:
+            _, node = node.select(self.c)
+            path.append(node)
+        if node.untried:
+            square = node.untried.pop(self.rng.integers(len(node.untried)))
+            child = node.play(square)
+            node.children[square] = child
+            path.append(child)
+        for visited in path:
+            visited.virtual += 1
+        self.max_depth = max(self.max_depth, len(path) - 1)
+        return path
+
+    def run(self, deadline: float) -> None:
+        last_batch = 0.0
+        # A batch is only started when one as long as the last still ends by the deadline
+        while time.perf_counter() + last_batch < deadline:
+            batch_start = time.perf_counter()
+            paths = [self._descend() for _ in range(self.batch)]
+            leaves = [path[-1] for path in paths]
+            player = np.repeat(np.array([leaf.player for leaf in leaves], dtype=np.uint64), self.rollouts)
+            opponent = np.repeat(np.array([leaf.opponent for leaf in leaves], dtype=np.uint64), self.rollouts)
+            results = playouts(player, opponent, self.rng).reshape(len(leaves), self.rollouts)
+            self.playouts += results.size
+            for path, outcome in zip(paths, results):
+                # Results are for the leaf's side to move; the node values are for the side that moved in
+                value = -float(outcome.mean())
+                for node in reversed(path):
+                    node.virtual -= 1
+                    node.visits += 1
+                    node.value += value
+                    value = -value
+            last_batch = time.perf_counter() - batch_start
+
+    def root_stats(self) -> Dict[int, Tuple[int, float]]:
+        return {square: (child.visits, child.value) for square, child in self.root.children.items()}
+
+
+# Each worker process keeps its own tree between moves
+_tree: Optional[Tree] = None
+
+
+def _search_worker(args) -> Tuple[Dict[int, Tuple[int, float]], int, int]:
+    global _tree
+    player, opponent, seconds, c, batch, rollouts, seed = args
+    if _tree is None:
+        _tree = Tree(c, batch, rollouts, seed)
+    _tree.playouts = _tree.max_depth = 0
+    _tree.set_position(player, opponent)
+    _tree.run(time.perf_counter() + seconds)
+    return _tree.root_stats(), _tree.playouts, _tree.max_depth
+
+
+class MCTSEngine:
+    """engines-style MCTS; options arrive as strings from the engine spec."""
+
+    def __init__(self, time: float = 1.0, workers: int = 1, c: float = 1.4, batch: int = 32,
+                 rollouts: int = 8, seed: Optional[int] = None):
+        self.name = f"mcts:time={time},workers={workers}"
+        self.default_time = float(time)
+        self.workers = int(workers)
+        self.options = (float(c), int(batch), int(rollouts))
+        self.seed = int(seed) if seed is not None else int.from_bytes(os.urandom(4), 'little')
+        self.moves_searched = 0
+        self.tree = Tree(*self.options, self.seed) if self.workers == 1 else None
+        self.executor = ProcessPoolExecutor(max_workers=self.workers) if self.workers > 1 else None
+
+    def search(self, position: engines.Position, limits: engines.Limits) -> engines.SearchResult:
+        start = time.perf_counter()
+        black, white = bitboard.to_bitboards(position.board)
+        player, opponent = (black, white) if position.color == 1 else (white, black)
+        if not bitboard.legal_moves(player, opponent):
+            return engines.SearchResult(None, nodes=0)
+        # Leave a little of the budget for the IPC and the final tally
+        seconds = (limits.time or self.default_time) * 0.95
+        self.moves_searched += 1
+        if self.tree is not None:
+            self.tree.playouts = self.tree.max_depth = 0
+            self.tree.set_position(player, opponent)
+            self.tree.run(start + seconds)
+            results = [(self.tree.root_stats(), self.tree.playouts, self.tree.max_depth)]
+        else:
+            args = [(player, opponent, seconds - (time.perf_counter() - start), *self.options,
+                     self.seed + self.moves_searched * 1000 + worker) for worker in range(self.workers)]
+            results = list(self.executor.map(_search_worker, args))
+
+        totals: Dict[int, List[float]] = {}
+        for stats, _, _ in results:
+            for square, (visits, value) in stats.items():
+                total = totals.setdefault(square, [0, 0.0])
+                total[0] += visits
+                total[1] += value
+        if not totals:
+            # Out of time before a single batch finished, any legal move beats none
+            square = next(bitboard.iter_bits(bitboard.legal_moves(player, opponent)))
+            return engines.SearchResult(divmod(square, 8), None, 0, 0, time.perf_counter() - start)
+        square, (visits, value) = max(totals.items(), key=lambda item: item[1][0])
+        best_move = None if square == PASS else divmod(square, 8)
+        return engines.SearchResult(best_move, value / visits if visits else None,
+                                    max(depth for _, _, depth in results),
+                                    sum(count for _, count, _ in results), time.perf_counter() - start)
+
+    def close(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown()
+
+    def __enter__(self) -> 'MCTSEngine':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
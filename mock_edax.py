@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""Stand-in for the Edax binary, backed by main4's engine.
+
+Speaks the part of Edax's text protocol that edax.py relies on (setboard,
+go, level, move-time, quit, the '>' prompt and 'Edax plays XX'), so drivers
+can be exercised without the real binary:
+
+    Edax = edax.start_edax('./mock_edax.py')
+"""
+import argparse
+import random
+import sys
+import time
+from typing import List, Optional, Tuple
+
+import edax
+import main4
+
+FEN_MAP = {'X': 1, '*': 1, 'B': 1, 'O': -1, 'W': -1, '.': 0, '-': 0}
+TURN_MAP = {'X': 1, '*': 1, 'B': 1, 'O': -1, 'W': -1}
+
+
+def parse_setboard(args: List[str]) -> Tuple[List[List[int]], int]:
+    # Accepts edax.py's "row/row/... X" as well as Edax's 64 character form,
+    # where the side to move may be glued on as a 65th character
+    text = ''.join(args).replace('/', '')
+    cells, turn = text[:64], text[64:65] or 'X'
+    if len(cells) != 64:
+        raise ValueError("setboard needs 64 squares")
+    board = [[FEN_MAP[cells[row * 8 + col].upper()] for col in range(8)] for row in range(8)]
+    return board, TURN_MAP[turn.upper()]
+
+
+class MockSearch:
+    def __init__(self):
+        self.nodes = 0
+
+    def negamax(self, board: List[List[int]], color: int, depth: int,
+                alpha: float, beta: float) -> Tuple[float, List[Tuple[int, int]]]:
+        self.nodes += 1
+        board_state = main4.BoardState.from_list(board)
+        if depth == 0:
+            return main4.evaluate_position(board_state, color), []
+
+        possible_moves = main4.get_valid_moves(board_state, color)
+        if not possible_moves:
+            if not main4.get_valid_moves(board_state, -color):
+                return main4.evaluate_position(board_state, color), []
+            score, pv = self.negamax(board, -color, depth - 1, -beta, -alpha)
+            return -score, pv
+
+        best_score, best_pv = float('-inf'), []
+        for row, col in sorted(possible_moves):
+            new_board = main4.make_move(board, row, col, color)
+            score, pv = self.negamax(new_board, -color, depth - 1, -beta, -alpha)
+            score = -score
+            if score > best_score:
+                best_score, best_pv = score, [(row, col)] + pv
+            alpha = max(alpha, score)
+            if alpha >= beta:
+                break
+        return best_score, best_pv
+
+
+def go(board: List[List[int]], color: int, depth: int) -> Optional[str]:
+    search = MockSearch()
+    start = time.perf_counter()
+    if not main4.get_valid_moves(main4.BoardState.from_list(board), color):
+        return None
+    score, pv = search.negamax(board, color, depth, float('-inf'), float('inf'))
+    elapsed = time.perf_counter() - start
+    speed = int(search.nodes / elapsed) if elapsed else 0
+    pv_text = ' '.join(edax.bot_to_edax(m) for m in pv)
+    print(f"{depth:>4}  {int(score):+d}  0:{elapsed:06.3f}  {search.nodes:>10}  {speed:>9}  {pv_text}")
+    return edax.bot_to_edax(pv[0])
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--level', '-l', type=int, default=5, help="search depth")
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help="extra seconds to wait before answering each go")
+    parser.add_argument('--jitter', type=float, default=0.0,
+                        help="random extra latency, up to this many seconds")
+    args, _ = parser.parse_known_args(argv)
+
+    board, color = main4.create_board(), 1
+    depth = args.level
+    print(">", flush=True)
+    for line in sys.stdin:
+        words = line.split()
+        if not words:
+            continue
+        command, params = words[0].lower(), words[1:]
+        if command in ('quit', 'q', 'exit'):
+            break
+        try:
+            if command == 'setboard':
+                board, color = parse_setboard(params)
+            elif command in ('init', 'new'):
+                board, color = main4.create_board(), 1
+            elif command in ('level', 'l'):
+                depth = int(params[0])
+            elif command == 'go':
+                delay = args.latency + random.uniform(0, args.jitter)
+                if delay:
+                    time.sleep(delay)
+                played = go(board, color, depth)
+                if played is None:
+                    print("Edax plays PS")
+                else:
+                    row, col = edax.edax_to_bot(played)
+                    board = main4.make_move(board, row, col, color)
+                    print(f"Edax plays {played.upper()}")
+                    color = -color
+        except (ValueError, KeyError, IndexError) as exc:
+            print(f"error: {exc}")
+        # move-time and any other option are accepted and ignored
+        print(">", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""Move generator benchmark and cross-check for every engine variant.
+
+Runs perft (leaf counts of the full game tree to a fixed depth) with each
+module's get_valid_moves/make_move, from the start position and from a
+seeded corpus of midgame positions, and compares the counts against the
+bitboard reference and each other. Results go to stdout and, with --json,
+to a file that --compare can diff against on a later commit:
+
+    python perft.py --json perft.json
+    python perft.py --compare perft.json
+"""
+import argparse
+import importlib
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+import bitboard
+
+# Known counts from the start position, passes counted as a ply
+START_PERFT = {1: 4, 2: 12, 3: 56, 4: 244, 5: 1396, 6: 8200, 7: 55092, 8: 390216, 9: 3005288}
+
+Board = List[List[int]]
+
+
+@dataclass
+class Implementation:
+    name: str
+    moves: Callable[[Board, int], list]
+    play: Callable[[Board, Tuple[int, int], int], Board]
+    reset: Callable[[], None] = lambda: None
+
+
+def _list_variant(module) -> Implementation:
+    # main.py/main2.py/main3.py: list boards, make_move mutates in place
+    def moves(board, color):
+        # They list a move once for each line of discs it flips; a game plays it only once
+        return list(dict.fromkeys(module.get_valid_moves(board, color)))
+
+    def play(board, played, color):
+        new_board = [row[:] for row in board]
+        module.make_move(new_board, played[0], played[1], color)
+        return new_board
+    return Implementation(module.__name__, moves, play)
+
+
+def _main4_variant(module) -> Implementation:
+    def moves(board, color):
+        return module.get_valid_moves(module.BoardState.from_list(board), color)
+
+    def play(board, played, color):
+        return module.make_move(board, played[0], played[1], color)
+
+    def reset():
+        # Measure move generation, not a warm cache left by the previous run
+        module.get_valid_moves.cache_clear()
+        module.GameCache.clear()
+    return Implementation(module.__name__, moves, play, reset)
+
+
+def _bitboard_variant() -> Implementation:
+    def moves(board, color):
+        black, white = bitboard.to_bitboards(board)
+        player, opponent = (black, white) if color == 1 else (white, black)
+        return [divmod(square, 8) for square in bitboard.iter_bits(bitboard.legal_moves(player, opponent))]
+
+    def play(board, played, color):
+        black, white = bitboard.to_bitboards(board)
+        player, opponent = (black, white) if color == 1 else (white, black)
+        square = played[0] * 8 + played[1]
+        flipped = bitboard.flips(player, opponent, square)
+        player |= flipped | (1 << square)
+        opponent &= ~flipped
+        return bitboard.from_bitboards(*((player, opponent) if color == 1 else (opponent, player)))
+    return Implementation('bitboard', moves, play)
+
+
+def load_implementations(names: List[str]) -> Tuple[List[Implementation], Dict[str, str]]:
+    implementations, errors = [], {}
+    for name in names:
+        if name == 'bitboard':
+            implementations.append(_bitboard_variant())
+            continue
+        try:
+            module = importlib.import_module(name)
+        except Exception as exc:
+            errors[name] = f"{type(exc).__name__}: {exc}"
+            continue
+        if hasattr(module, 'BoardState'):
+            implementations.append(_main4_variant(module))
+        else:
+            implementations.append(_list_variant(module))
+    return implementations, errors
+
+
+def perft(impl: Implementation, board: Board, color: int, depth: int) -> int:
+    if depth == 0:
+        return 1
+    moves = impl.moves(board, color)
+    if not moves:
+        if not impl.moves(board, -color):
+            return 1
+        return perft(impl, board, -color, depth - 1)
+    nodes = 0
+    for played in moves:
+        nodes += perft(impl, impl.play(board, played, color), -color, depth - 1)
+    return nodes
+
+
+def bitboard_perft(player: int, opponent: int, depth: int) -> int:
+    """Reference count, independent of the engine modules."""
+    if depth == 0:
+        return 1
+    moves = bitboard.legal_moves(player, opponent)
+    if not moves:
+        if not bitboard.legal_moves(opponent, player):
+            return 1
+        return bitboard_perft(opponent, player, depth - 1)
+    nodes = 0
+    for square in bitboard.iter_bits(moves):
+        flipped = bitboard.flips(player, opponent, square)
+        nodes += bitboard_perft(opponent & ~flipped, player | flipped | (1 << square), depth - 1)
+    return nodes
+
+
+def start_board() -> Board:
+    board = [[0] * 8 for _ in range(8)]
+    board[3][3] = board[4][4] = -1
+    board[3][4] = board[4][3] = 1
+    return board
+
+
+def midgame_corpus(count: int, plies: int, seed: int) -> List[Tuple[str, Board, int]]:
+    rng = random.Random(seed)
+    corpus = []
+    while len(corpus) < count:
+        black, white = bitboard.to_bitboards(start_board())
+        player, opponent, color = black, white, 1
+        for _ in range(plies):
+            squares = list(bitboard.iter_bits(bitboard.legal_moves(player, opponent)))
+            if not squares:
+                break
+            square = rng.choice(squares)
+            flipped = bitboard.flips(player, opponent, square)
+            player, opponent = opponent & ~flipped, player | flipped | (1 << square)
+            color = -color
+        if not bitboard.legal_moves(player, opponent):
+            continue
+        black, white = (player, opponent) if color == 1 else (opponent, player)
+        corpus.append((f"mid{len(corpus)}", bitboard.from_bitboards(black, white), color))
+    return corpus
+
+
+def run(implementations: List[Implementation], positions: List[Tuple[str, Board, int, int]]) -> dict:
+    results: Dict[str, dict] = {}
+    mismatches = []
+    for name, board, color, depth in positions:
+        black, white = bitboard.to_bitboards(board)
+        player, opponent = (black, white) if color == 1 else (white, black)
+        expected = START_PERFT.get(depth) if name == 'start' else bitboard_perft(player, opponent, depth)
+        for impl in implementations:
+            impl.reset()
+            started = time.perf_counter()
+            nodes = perft(impl, board, color, depth)
+            elapsed = time.perf_counter() - started
+            entry = results.setdefault(impl.name, {'positions': [], 'nodes': 0, 'time': 0.0})
+            entry['positions'].append({
+                'position': name, 'depth': depth, 'nodes': nodes, 'expected': expected,
+                'time': round(elapsed, 6), 'nps': round(nodes / elapsed) if elapsed else None,
+            })
+            entry['nodes'] += nodes
+            entry['time'] += elapsed
+            if expected is not None and nodes != expected:
+                mismatches.append({'implementation': impl.name, 'position': name,
+                                   'depth': depth, 'nodes': nodes, 'expected': expected})
+    for entry in results.values():
+        entry['time'] = round(entry['time'], 6)
+        entry['nps'] = round(entry['nodes'] / entry['time']) if entry['time'] else None
+    return {'implementations': results, 'mismatches': mismatches}
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: dict, baseline: dict) -> List[str]:
+    lines = []
+    for name, entry in current['implementations'].items():
+        old = baseline.get('implementations', {}).get(name)
+        if not old or not old.get('nps') or not entry.get('nps'):
+            continue
+        change = entry['nps'] / old['nps'] - 1
+        lines.append(f"{name:<10} {old['nps']:>10} -> {entry['nps']:>10} nps ({change:+.1%})")
+    return lines
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Perft benchmark across move generators")
+    parser.add_argument('--impl', action='append',
+                        help="module to test, default main, main2, main3, main4 and bitboard")
+    parser.add_argument('--depth', type=int, default=6, help="perft depth from the start")
+    parser.add_argument('--midgame-depth', type=int, default=3)
+    parser.add_argument('--positions', type=int, default=20, help="midgame corpus size")
+    parser.add_argument('--plies', type=int, default=20, help="random plies per midgame position")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', help="write machine readable results here")
+    parser.add_argument('--compare', help="previous --json output to compare speed against")
+    args = parser.parse_args()
+
+    implementations, errors = load_implementations(
+        args.impl or ['main', 'main2', 'main3', 'main4', 'bitboard'])
+    positions = [('start', start_board(), 1, args.depth)]
+    positions += [(name, board, color, args.midgame_depth)
+                  for name, board, color in midgame_corpus(args.positions, args.plies, args.seed)]
+
+    report = run(implementations, positions)
+    report.update(errors=errors, revision=git_revision(), python=platform.python_version(),
+                  settings=vars(args))
+
+    for name, entry in report['implementations'].items():
+        print(f"{name:<10} {entry['nodes']:>10} nodes {entry['time']:>9.3f}s {entry['nps']:>10} nps")
+    for name, error in errors.items():
+        print(f"{name:<10} skipped, {error}")
+    for mismatch in report['mismatches']:
+        print(f"MISMATCH {mismatch['implementation']} {mismatch['position']} depth "
+              f"{mismatch['depth']}: {mismatch['nodes']} != {mismatch['expected']}")
+    if args.compare:
+        with open(args.compare) as f:
+            print("\n".join(compare(report, json.load(f))))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+    sys.exit(1 if report['mismatches'] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""Opt-in per-move profiling for main4.
+
+Enabled with OTHELLO_PROFILE=<directory> or profiling.enable(directory).
+Every move() then writes, for the parent and each pool worker:
+
+    move-<pid>-<n>-parent.pstats / move-<pid>-<n>-worker-<pid>.pstats   (cprofile mode)
+    move-<pid>-<n>-parent.collapsed / ...-worker-<pid>.collapsed        (sample mode)
+
+plus move-<pid>-<n>-summary.json with time split into move generation,
+evaluation, caching, IPC and the rest. Collapsed stacks feed straight into
+flamegraph.pl or speedscope; pstats files open with snakeviz or gprof2dot.
+OTHELLO_PROFILE_MODE=sample selects the low-overhead sampling profiler and
+OTHELLO_PROFILE_INTERVAL its period in seconds.
+"""
+import glob
+import itertools
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+# cProfile, pstats, json and multiprocessing are imported once profiling is on,
+# main4 and every pool worker import this module
+
+_settings = {
+    'directory': os.environ.get('OTHELLO_PROFILE'),
+    'mode': os.environ.get('OTHELLO_PROFILE_MODE', 'cprofile'),
+    'interval': float(os.environ.get('OTHELLO_PROFILE_INTERVAL', '0.001')),
+}
+_move_numbers = itertools.count()
+# Id of the move being profiled in this process, None outside profile_move()
+_current: Optional[str] = None
+
+CATEGORIES = {
+    'movegen': ('get_valid_moves', 'make_move', 'legal_moves', 'flips', 'iter_bits', 'is_valid_move',
+                'check_direction'),
+    'evaluation': ('evaluate_position',),
+    'cache': ('from_list', 'to_list', '__hash__', '__eq__', 'cache_info', 'clear'),
+}
+# IPC is told apart by module, names like get, put or wait are far too common on their own
+IPC_MODULES = ('multiprocessing', '_multiprocessing', 'concurrent.futures', 'pickle', '_pickle',
+               'socket', '_socket', 'select', 'selectors')
+_IPC = re.compile(r'(?:^|\.)(?:%s)(?:\.|$)' % '|'.join(map(re.escape, IPC_MODULES)))
+# Lock and condition waits only count as IPC when an IPC module is waiting through them
+_WAITS = re.compile(r'(?:^|\.)threading$')
+
+
+def enable(directory: str, mode: str = 'cprofile', interval: float = 0.001) -> None:
+    if mode not in ('cprofile', 'sample'):
+        raise ValueError(f"unknown profiling mode {mode!r}")
+    os.makedirs(directory, exist_ok=True)
+    _settings.update(directory=directory, mode=mode, interval=interval)
+
+
+def disable() -> None:
+    _settings['directory'] = None
+
+
+def enabled() -> bool:
+    return bool(_settings['directory'])
+
+
+class Sampler:
+    """Samples one thread's Python stack on a timer and counts collapsed stacks."""
+
+    def __init__(self, interval: float = 0.001, thread_id: Optional[int] = None):
+        self.interval = interval
+        self.thread_id = thread_id or threading.get_ident()
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                module = frame.f_globals.get('__name__') or os.path.basename(code.co_filename)
+                names.append(f"{module}:{code.co_name}")
+                frame = frame.f_back
+            if names:
+                self.stacks[';'.join(reversed(names))] += 1
+
+    def enable(self) -> None:
+        self._thread.start()
+
+    def disable(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def dump(self, path: str) -> None:
+        with open(path, 'w') as f:
+            for stack, count in self.stacks.items():
+                f.write(f"{stack} {count}\n")
+
+
+def _start():
+    if _settings['mode'] == 'sample':
+        profiler = Sampler(_settings['interval'])
+    else:
+        import cProfile
+        profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+
+def _stop(profiler, base: str) -> None:
+    profiler.disable()
+    if isinstance(profiler, Sampler):
+        profiler.dump(base + '.collapsed')
+    else:
+        profiler.dump_stats(base + '.pstats')
+
+
+def module_of(filename: str, function_name: str) -> str:
+    """Dotted module path of a pstats entry, '' when it can't be told."""
+    if filename != '~':
+        return os.path.splitext(filename)[0].replace(os.sep, '.')
+    # Builtins show up as "<method 'acquire' of '_thread.lock' objects>" or "<built-in method _pickle.dumps>"
+    match = re.match(r"<method '\w+' of '([\w.]+)' objects>|<built-in method ([\w.]+)\.\w+>", function_name)
+    return (match.group(1) or match.group(2)) if match else ''
+
+
+def category(module: str, function_name: str) -> str:
+    if _IPC.search(module):
+        return 'ipc'
+    match = re.match(r"<(?:built-in )?method '?([\w.]+)'?", function_name)
+    if match:
+        function_name = match.group(1).rsplit('.', 1)[-1]
+    for name, functions in CATEGORIES.items():
+        if function_name in functions:
+            return name
+    return 'other'
+
+
+def _stats_category(stats: dict, key: tuple, seen: Optional[set] = None) -> str:
+    name = category(module_of(key[0], key[2]), key[2])
+    if name != 'other':
+        return name
+    # Builtins and threading waits take after the callers they wait for
+    seen = set() if seen is None else seen
+    if key in seen or not (key[0] == '~' or _WAITS.search(module_of(key[0], key[2]))):
+        return name
+    seen.add(key)
+    callers = stats[key][4] if key in stats else {}
+    return 'ipc' if any(_stats_category(stats, caller, seen) == 'ipc' for caller in callers) else name
+
+
+def _stack_category(stack: str) -> str:
+    frames = [frame.rsplit(':', 1) for frame in reversed(stack.split(';'))]
+    name = category(*frames[0])
+    if name != 'other':
+        return name
+    for module, _ in frames:
+        if _IPC.search(module):
+            return 'ipc'
+        if not _WAITS.search(module):
+            break
+    return name
+
+
+def summarize(move_id: str) -> Dict[str, Dict[str, float]]:
+    """Seconds (cprofile) or samples (sample mode) per category, per process."""
+    import pstats
+    directory = _settings['directory']
+    summary: Dict[str, Dict[str, float]] = {}
+    for path in sorted(glob.glob(os.path.join(directory, f"{move_id}-*.pstats"))):
+        totals: Dict[str, float] = defaultdict(float)
+        stats = pstats.Stats(path).stats
+        for key, entry in stats.items():
+            totals[_stats_category(stats, key)] += entry[2]  # own time
+        summary[os.path.basename(path)] = dict(totals)
+    for path in sorted(glob.glob(os.path.join(directory, f"{move_id}-*.collapsed"))):
+        totals = defaultdict(float)
+        with open(path) as f:
+            for line in f:
+                stack, count = line.rsplit(' ', 1)
+                totals[_stack_category(stack)] += int(count)
+        summary[os.path.basename(path)] = dict(totals)
+    return summary
+
+
+@contextmanager
+def profile_move(label: str = 'move'):
+    """Profiles the enclosed block as one move; a no-op while profiling is off."""
+    global _current
+    if not enabled() or _current is not None:
+        yield None
+        return
+    import json
+    os.makedirs(_settings['directory'], exist_ok=True)
+    move_id = f"{label}-{os.getpid()}-{next(_move_numbers):04d}"
+    base = os.path.join(_settings['directory'], move_id)
+    _current = move_id
+    start = time.perf_counter()
+    profiler = _start()
+    try:
+        yield move_id
+    finally:
+        _stop(profiler, base + '-parent')
+        _current = None
+        with open(base + '-summary.json', 'w') as f:
+            json.dump({'move': move_id, 'wall_time': time.perf_counter() - start,
+                       'mode': _settings['mode'], 'processes': summarize(move_id)}, f, indent=2)
+
+
+def _start_worker(settings: dict, move_id: str) -> None:
+    from multiprocessing.util import Finalize
+    _settings.update(settings)
+    profiler = _start()
+    base = os.path.join(settings['directory'], f"{move_id}-worker-{os.getpid()}")
+    # Pool workers leave through multiprocessing's exit path, which runs finalizers
+    Finalize(None, _stop, args=(profiler, base), exitpriority=10)
+
+
+def worker_initializer() -> Tuple[Optional[object], tuple]:
+    """(initializer, initargs) for a process pool serving the move being profiled."""
+    if _current is None:
+        return None, ()
+    return _start_worker, (dict(_settings), _current)
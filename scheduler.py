@@ -0,0 +1,250 @@
+"""One worker pool shared by searches from many games.
+
+main4.search_root gives every search all the pool's workers, so concurrent
+games oversubscribe the machine. The Scheduler instead splits each search
+into root-move work units and feeds them to a single pool, keeping no more
+units in flight than there are workers so it, not the pool's queue, decides
+what runs next:
+
+- a search whose deadline is about to be missed goes first (earliest deadline
+  among those out of slack);
+- otherwise the game that has used the least worker time goes next, so many
+  games share the pool fairly instead of first come, first served.
+
+A search still running at its deadline is answered with the best of the root
+moves finished so far.
+
+    scheduler = Scheduler(workers=8)
+    result = scheduler.submit('game-1', board, 1, depth=6, time_limit=2.0).result()
+    best_move, score, depth = scheduler.search_iterative('game-1', board, 1, time_limit=2.0)
+"""
+import itertools
+import multiprocessing as mp
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Dict, Hashable, List, Optional, Tuple
+
+import main4
+
+Move = Optional[Tuple[int, int]]
+
+
+@dataclass
+class Result:
+    move: Move
+    score: Optional[float]
+    depth: int
+    # False when the deadline cut the search short and only some root moves were scored
+    complete: bool = True
+    # Score of every root move that was searched
+    scores: Dict[Tuple[int, int], float] = field(default_factory=dict)
+
+
+class _Request:
+    def __init__(self, seq: int, game: Hashable, moves: List[Tuple[int, int]], args: list,
+                 depth: int, deadline: Optional[float], stats: Optional[main4.SearchStats]):
+        self.seq = seq
+        self.game = game
+        self.moves = moves
+        self.args = args
+        self.depth = depth
+        self.deadline = deadline
+        self.stats = stats
+        self.future: Future = Future()
+        self.pending = deque(range(len(args)))
+        self.results: Dict[int, Tuple[float, main4.SearchStats, float]] = {}
+        self.running = 0
+        self.start = time.perf_counter()
+
+    def unit_time(self, default: float) -> float:
+        if not self.results:
+            return default
+        return sum(elapsed for _, _, elapsed in self.results.values()) / len(self.results)
+
+
+class Scheduler:
+    def __init__(self, workers: int = mp.cpu_count()):
+        self.workers = workers
+        self.executor = ProcessPoolExecutor(max_workers=workers)
+        self._changed = threading.Condition()
+        self._requests: List[_Request] = []
+        # Worker seconds used per game, the fair-share currency
+        self._service: Dict[Hashable, float] = {}
+        self._in_flight = 0
+        self._seq = itertools.count()
+        # Running average of a unit's worker time, for requests with none finished yet
+        self._average_unit = 0.01
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, game: Hashable, board: List[List[int]], color: int,
+               depth: Optional[int] = None, time_limit: Optional[float] = None,
+               deadline: Optional[float] = None,
+               stats: Optional[main4.SearchStats] = None) -> Future:
+        """Queues one fixed-depth root search; the future resolves to a Result.
+
+        deadline is a time.monotonic() value and overrides time_limit.
+        """
+        moves, args, depth = main4.split_root(board, color, depth)
+        depth = min(depth, sum(row.count(0) for row in board))
+        if deadline is None and time_limit is not None:
+            deadline = time.monotonic() + time_limit
+        with self._changed:
+            if self._closed:
+                raise RuntimeError("scheduler is closed")
+            request = _Request(next(self._seq), game, moves, args, depth, deadline, stats)
+            if not moves:
+                request.future.set_result(Result(None, 0, depth))
+                return request.future
+            if game not in self._service:
+                # A newcomer starts level with the games already running rather than at zero,
+                # or it would have the pool to itself until it caught up
+                active = [self._service[other.game] for other in self._requests]
+                self._service[game] = min(active, default=0.0)
+            self._requests.append(request)
+            self._changed.notify()
+        return request.future
+
+    def search_iterative(self, game: Hashable, board: List[List[int]], color: int,
+                         time_limit: Optional[float] = None, max_depth: int = 6,
+                         stats: Optional[main4.SearchStats] = None) -> Tuple[Move, float, int]:
+        """main4.search_iterative over the shared pool, with the whole search under one deadline."""
+        start = time.monotonic()
+        deadline = start + time_limit if time_limit is not None else None
+        empty_spaces = sum(row.count(0) for row in board)
+        if empty_spaces <= 10:
+            result = self.submit(game, board, color, deadline=deadline, stats=stats).result()
+            return result.move, result.score, result.depth if result.complete else 0
+
+        best: Optional[Result] = None
+        last_time = 0.0
+        for depth in range(1, max_depth + 1):
+            elapsed = time.monotonic() - start
+            if best is not None and time_limit is not None and elapsed + last_time * 4 > time_limit:
+                break
+            iteration_start = time.monotonic()
+            result = self.submit(game, board, color, depth, deadline=deadline, stats=stats).result()
+            last_time = time.monotonic() - iteration_start
+            # A cut-short iteration only beats having nothing at all
+            if result.complete or best is None:
+                best = result
+            if not result.complete or result.move is None:
+                break
+        return best.move, best.score, best.depth if best.complete else best.depth - 1
+
+    def forget(self, game: Hashable) -> None:
+        """Drops a finished game's fair-share account."""
+        with self._changed:
+            if not any(request.game == game for request in self._requests):
+                self._service.pop(game, None)
+
+    def close(self) -> None:
+        with self._changed:
+            self._closed = True
+            for request in self._requests:
+                request.future.cancel()
+            self._requests.clear()
+            self._changed.notify()
+        self._thread.join()
+        self.executor.shutdown()
+
+    def __enter__(self) -> 'Scheduler':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _pick(self, now: float) -> Optional[_Request]:
+        waiting = [request for request in self._requests if request.pending]
+        if not waiting:
+            return None
+        urgent = []
+        for request in waiting:
+            if request.deadline is None:
+                continue
+            unit_time = request.unit_time(self._average_unit)
+            # Time the rest needs if it got every worker, plus one unit of margin
+            needed = (len(request.pending) / self.workers + 1) * unit_time
+            if request.deadline - now <= needed:
+                urgent.append(request)
+        if urgent:
+            return min(urgent, key=lambda request: request.deadline)
+        return min(waiting, key=lambda request: (self._service[request.game], request.seq))
+
+    def _dispatch(self, request: _Request) -> None:
+        index = request.pending.popleft()
+        request.running += 1
+        self._in_flight += 1
+        # Charge the expected cost now so one game can't grab every free worker at once
+        self._service[request.game] += request.unit_time(self._average_unit)
+        future = self.executor.submit(main4.look_ahead_stats_worker, request.args[index])
+        future.add_done_callback(partial(self._unit_done, request, index))
+
+    def _unit_done(self, request: _Request, index: int, future: Future) -> None:
+        with self._changed:
+            self._in_flight -= 1
+            request.running -= 1
+            error = RuntimeError("work unit cancelled") if future.cancelled() else future.exception()
+            if error is not None:
+                if not request.future.done():
+                    self._requests.remove(request)
+                    request.future.set_exception(error)
+                self._changed.notify()
+                return
+            score, stats, elapsed = future.result()
+            if request.game in self._service:
+                self._service[request.game] += elapsed - request.unit_time(self._average_unit)
+            self._average_unit = 0.9 * self._average_unit + 0.1 * elapsed
+            if not request.future.done():
+                request.results[index] = (score, stats, elapsed)
+                if len(request.results) == len(request.args):
+                    self._finish(request)
+            self._changed.notify()
+
+    def _finish(self, request: _Request) -> None:
+        self._requests.remove(request)
+        request.pending.clear()
+        complete = len(request.results) == len(request.args)
+        best_move, best_score = request.moves[0], None
+        for index in sorted(request.results):
+            score = request.results[index][0]
+            if best_score is None or score > best_score:
+                best_move, best_score = request.moves[index], score
+        if request.stats is not None:
+            stats = request.stats
+            wall_time = time.perf_counter() - request.start
+            nodes_before = stats.nodes
+            stats.nodes += 1
+            for index, (score, worker_stats, elapsed) in sorted(request.results.items()):
+                stats.merge(worker_stats)
+                stats.worker_busy_time += elapsed
+                stats.root_moves.append({'move': list(request.moves[index]), 'score': score,
+                                         'nodes': worker_stats.nodes, 'time': elapsed})
+            stats.depth = request.depth
+            stats.workers = self.workers
+            stats.wall_time += wall_time
+            stats.iterations.append({'depth': request.depth, 'time': wall_time,
+                                     'nodes': stats.nodes - nodes_before,
+                                     'best_move': list(best_move), 'complete': complete})
+        scores = {request.moves[index]: result[0] for index, result in request.results.items()}
+        request.future.set_result(Result(best_move, best_score, request.depth, complete, scores))
+
+    def _run(self) -> None:
+        with self._changed:
+            while not self._closed:
+                now = time.monotonic()
+                for request in [request for request in self._requests
+                                if request.deadline is not None and request.deadline <= now]:
+                    self._finish(request)
+                while self._in_flight < self.workers:
+                    request = self._pick(now)
+                    if request is None:
+                        break
+                    self._dispatch(request)
+                deadlines = [request.deadline for request in self._requests if request.deadline is not None]
+                self._changed.wait(max(0.0, min(deadlines) - now) if deadlines else None)
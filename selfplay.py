@@ -0,0 +1,180 @@
+"""Self-play training data generator.
+
+Plays main4 against itself over a process pool and streams every searched
+position into fixed-size, zlib-compressed shards:
+
+    python selfplay.py --games 10000 --out data/selfplay
+
+Each record is a packed 16-byte board, the side to move, the search score
+from the side to move's point of view, the final disc difference from that
+same side and an exact flag. Scores are on two scales: exact ones are the
+solved disc difference of a position whose whole endgame was searched, the
+rest are main4 heuristic evaluations. A shard only appears under its final name once it has been
+fully written and synced, so a crash loses at most the shard in progress.
+"""
+import argparse
+import os
+import random
+import struct
+import zlib
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Iterator, List, Optional, Tuple
+
+import bitboard
+import main4
+
+MAGIC = b'OTSP'
+VERSION = 2
+# board, side to move, score, final result, score is an exact disc difference
+RECORD = struct.Struct('<16sbhb?')
+HEADER = struct.Struct('<4sHI')
+
+
+def encode_record(board: List[List[int]], color: int, score: float, result: int,
+                  exact: bool = False) -> bytes:
+    score = int(max(-32768, min(32767, score)))
+    return RECORD.pack(bitboard.pack(board), color, score, result, exact)
+
+
+def decode_record(data: bytes) -> Tuple[List[List[int]], int, int, int, bool]:
+    packed, color, score, result, exact = RECORD.unpack(data)
+    return bitboard.unpack(packed), color, score, result, exact
+
+
+def _init_worker() -> None:
+    # Games already fill every CPU, so each one searches in its own process
+    main4.ROOT_WORKERS = 1
+
+
+def play_selfplay_game(seed: int, depth: Optional[int], random_plies: int) -> List[bytes]:
+    rng = random.Random(seed)
+    positions = []
+
+    def bot(board, player_color):
+        if len(positions) < random_plies:
+            # Random opening moves carry no search score, keep them out of the data
+            positions.append(None)
+            moves = sorted(main4.get_valid_moves(main4.BoardState.from_list(board), player_color))
+            return rng.choice(moves) if moves else None
+        best_move, score = main4.search_root(board, player_color, depth)
+        if best_move is not None:
+            # search_root's own default depth, which solves the last 10 empties
+            empty_spaces = sum(row.count(0) for row in board)
+            searched = depth if depth is not None else 40 if empty_spaces <= 10 else 6
+            positions.append(([row[:] for row in board], player_color, score, searched >= empty_spaces))
+        return best_move
+
+    black_count, white_count = main4.play_game(bot, bot, verbose=False)
+    black_result = black_count - white_count
+    return [encode_record(board, color, score, black_result * color, exact)
+            for board, color, score, exact in filter(None, positions)]
+
+
+class ShardWriter:
+    """Collects records and writes them out as numbered fixed-size shards."""
+
+    def __init__(self, directory: str, positions_per_shard: int = 65536):
+        self.directory = directory
+        self.positions_per_shard = positions_per_shard
+        self.buffer: List[bytes] = []
+        os.makedirs(directory, exist_ok=True)
+        # Append-only: carry on numbering after the shards already on disk
+        self.next_index = len(list_shards(directory))
+
+    def add(self, records: List[bytes]) -> None:
+        self.buffer.extend(records)
+        while len(self.buffer) >= self.positions_per_shard:
+            self._write(self.buffer[:self.positions_per_shard])
+            self.buffer = self.buffer[self.positions_per_shard:]
+
+    def close(self) -> None:
+        # The trailing partial shard is the only one shorter than the rest
+        if self.buffer:
+            self._write(self.buffer)
+            self.buffer = []
+
+    def _write(self, records: List[bytes]) -> None:
+        name = os.path.join(self.directory, f"shard-{self.next_index:06d}.bin.z")
+        tmp_name = name + '.tmp'
+        body = zlib.compress(b''.join(records), 6)
+        with open(tmp_name, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, len(records)))
+            f.write(body)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_name, name)
+        dir_fd = os.open(self.directory, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+        self.next_index += 1
+
+
+def list_shards(directory: str) -> List[str]:
+    if not os.path.isdir(directory):
+        return []
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                  if name.startswith('shard-') and name.endswith('.bin.z'))
+
+
+def read_shard(path: str) -> Iterator[Tuple[List[List[int]], int, int, int, bool]]:
+    with open(path, 'rb') as f:
+        magic, version, count = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} self-play shard")
+        data = zlib.decompress(f.read())
+    if len(data) != count * RECORD.size:
+        raise ValueError(f"{path} is truncated")
+    for offset in range(0, len(data), RECORD.size):
+        yield decode_record(data[offset:offset + RECORD.size])
+
+
+def iter_positions(directory: str) -> Iterator[Tuple[List[List[int]], int, int, int, bool]]:
+    for path in list_shards(directory):
+        yield from read_shard(path)
+
+
+def generate(games: int, directory: str, workers: int, depth: Optional[int],
+             random_plies: int, positions_per_shard: int, seed: int) -> None:
+    writer = ShardWriter(directory, positions_per_shard)
+    # Offset the seeds by the existing shard count so a resumed run doesn't replay old games
+    seed += writer.next_index * 1_000_003
+    submitted = finished = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        running = set()
+        try:
+            while finished < games:
+                # Keep a bounded number of games in flight instead of queueing all of them
+                while submitted < games and len(running) < workers * 2:
+                    running.add(executor.submit(play_selfplay_game, seed + submitted,
+                                                depth, random_plies))
+                    submitted += 1
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    writer.add(future.result())
+                    finished += 1
+                    if finished % 100 == 0:
+                        print(f"{finished}/{games} games, {writer.next_index} shards")
+        finally:
+            writer.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate self-play training shards")
+    parser.add_argument('--games', type=int, default=1000)
+    parser.add_argument('--out', default='selfplay')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--depth', type=int, default=None,
+                        help="search depth, defaults to move()'s own schedule")
+    parser.add_argument('--random-plies', type=int, default=8,
+                        help="random opening moves played before searching")
+    parser.add_argument('--shard-size', type=int, default=65536, help="positions per shard")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    generate(args.games, args.out, args.workers, args.depth, args.random_plies,
+             args.shard_size, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""Long-running main4 engine server.
+
+Keeps one process pool alive so its workers' evaluation and move caches stay
+warm across games, and multiplexes many games over one connection. Searches
+from all games go through a scheduler.Scheduler, which shares the workers
+between games by root move instead of letting each search take them all. Speaks a
+line protocol modeled on the Edax commands edax.py sends, each line prefixed
+with a game id chosen by the client:
+
+    g1 setboard <fen> X          ->  g1 ok
+    g1 play F5                   ->  g1 ok
+    g1 forget                    ->  g1 ok
+    g1 go [time=1.5] [depth=8]   ->  g1 plays D3 score=4 depth=6 nodes=51234 time=1.42
+    ping                         ->  pong
+    stats                        ->  stats games=2 searches=17 busy=1
+    quit
+
+Searches for different games run concurrently; commands for one game are
+answered in order. Errors come back as `<game> error <message>`.
+
+    python server.py                        # stdin/stdout
+    python server.py --socket /tmp/othello.sock
+"""
+import argparse
+import asyncio
+import multiprocessing as mp
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Tuple
+
+import edax
+import main4
+from scheduler import Scheduler
+
+Write = Callable[[str], Awaitable[None]]
+
+
+@dataclass
+class Game:
+    board: List[List[int]] = field(default_factory=main4.create_board)
+    color: int = 1
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+
+class EngineServer:
+    def __init__(self, workers: int = mp.cpu_count(), concurrent_games: int = 8,
+                 default_time: float = 5.0, max_depth: int = 12):
+        self.scheduler = Scheduler(workers)
+        # Searches block until the scheduler answers, so each running one holds a thread
+        self.threads = ThreadPoolExecutor(max_workers=concurrent_games)
+        self.default_time = default_time
+        self.max_depth = max_depth
+        self.games: Dict[Tuple[int, str], Game] = {}
+        self.searches = 0
+        self.busy = 0
+
+    def close(self) -> None:
+        self.scheduler.close()
+        self.threads.shutdown()
+
+    def _search(self, key: Tuple[int, str], board: List[List[int]], color: int,
+                time_limit: float, max_depth: int) -> str:
+        stats = main4.SearchStats()
+        start = time.perf_counter()
+        best_move, score, depth = self.scheduler.search_iterative(key, board, color, time_limit,
+                                                                  max_depth, stats=stats)
+        elapsed = time.perf_counter() - start
+        move_text = edax.bot_to_edax(best_move).upper() if best_move else 'PS'
+        # An endgame solve cut off before any move finished has no score
+        score_text = '?' if score is None else f"{score:g}"
+        return f"plays {move_text} score={score_text} depth={depth} nodes={stats.nodes} time={elapsed:.2f}"
+
+    async def _go(self, key: Tuple[int, str], game: Game, options: List[str]) -> str:
+        time_limit, max_depth = self.default_time, self.max_depth
+        for option in options:
+            name, _, value = option.partition('=')
+            if name == 'time':
+                time_limit = float(value)
+            elif name == 'depth':
+                max_depth = int(value)
+            else:
+                raise ValueError(f"unknown go option {name!r}")
+        self.searches += 1
+        self.busy += 1
+        try:
+            board = [row[:] for row in game.board]
+            return await asyncio.get_running_loop().run_in_executor(
+                self.threads, self._search, key, board, game.color, time_limit, max_depth)
+        finally:
+            self.busy -= 1
+
+    def _play(self, game: Game, square: str) -> None:
+        if square.upper() in ('PS', 'PA'):
+            game.color = -game.color
+            return
+        if len(square) != 2 or square[0].upper() not in 'ABCDEFGH' or square[1] not in '12345678':
+            raise ValueError(f"bad square {square!r}")
+        row, col = edax.edax_to_bot(square)
+        if (row, col) not in main4.get_valid_moves(main4.BoardState.from_list(game.board), game.color):
+            raise ValueError(f"illegal move {square}")
+        game.board = main4.make_move(game.board, row, col, game.color)
+        game.color = -game.color
+
+    async def _game_command(self, key: Tuple[int, str], command: str, args: List[str]) -> str:
+        game = self.games.setdefault(key, Game())
+        async with game.lock:
+            if command == 'setboard':
+                rows = args[0].split('/') if args else []
+                if (len(args) != 2 or len(rows) != 8 or any(len(row) != 8 for row in rows)
+                        or set(args[0]) - set('.XO/') or args[1].upper() not in ('X', 'O')):
+                    raise ValueError("usage: setboard <fen> <X|O>")
+                game.board = edax.fen_to_arr(args[0])
+                game.color = 1 if args[1].upper() == 'X' else -1
+                return 'ok'
+            if command == 'play':
+                if len(args) != 1:
+                    raise ValueError("usage: play <move>")
+                self._play(game, args[0])
+                return 'ok'
+            if command == 'go':
+                return await self._go(key, game, args)
+            if command == 'forget':
+                if self.games.get(key) is game:
+                    del self.games[key]
+                self.scheduler.forget(key)
+                return 'ok'
+            raise ValueError(f"unknown command {command!r}")
+
+    async def handle(self, client: int, line: str, write: Write) -> None:
+        words = line.split()
+        if not words:
+            return
+        if words[0] == 'ping':
+            await write('pong')
+            return
+        if words[0] == 'stats':
+            await write(f"stats games={len(self.games)} searches={self.searches} busy={self.busy}")
+            return
+        if len(words) < 2:
+            await write(f"{words[0]} error missing command")
+            return
+        name, command, args = words[0], words[1], words[2:]
+        try:
+            reply = await self._game_command((client, name), command, args)
+        except ValueError as e:
+            reply = f"error {e}"
+        except Exception as e:
+            # A failed search (a broken pool, say) must not take every other game down with it
+            reply = f"error {type(e).__name__}: {e}"
+        await write(f"{name} {reply}")
+
+    async def serve(self, client: int, reader: asyncio.StreamReader, write: Write) -> None:
+        tasks = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                line = line.decode().strip()
+                if line == 'quit':
+                    break
+                # Each line runs on its own so one game's search doesn't hold up the others
+                task = asyncio.create_task(self.handle(client, line, write))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        finally:
+            for key in [key for key in self.games if key[0] == client]:
+                del self.games[key]
+                self.scheduler.forget(key)
+
+
+async def serve_stdio(server: EngineServer) -> None:
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader()
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+
+    async def write(text: str) -> None:
+        sys.stdout.write(text + '\n')
+        sys.stdout.flush()
+    await server.serve(0, reader, write)
+
+
+async def serve_socket(server: EngineServer, path: str) -> None:
+    clients = iter(range(1, sys.maxsize))
+
+    async def connected(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        async def write(text: str) -> None:
+            writer.write(text.encode() + b'\n')
+            await writer.drain()
+        try:
+            await server.serve(next(clients), reader, write)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    if os.path.exists(path):
+        os.unlink(path)
+    unix_server = await asyncio.start_unix_server(connected, path)
+    try:
+        async with unix_server:
+            await unix_server.serve_forever()
+    finally:
+        if os.path.exists(path):
+            os.unlink(path)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve main4 over a line protocol")
+    parser.add_argument('--socket', help="listen on this Unix socket instead of stdin/stdout")
+    parser.add_argument('--workers', type=int, default=mp.cpu_count())
+    parser.add_argument('--games', type=int, default=8, help="searches run at the same time")
+    parser.add_argument('--time', type=float, default=5.0, help="default seconds per go")
+    parser.add_argument('--max-depth', type=int, default=12)
+    args = parser.parse_args()
+
+    server = EngineServer(args.workers, args.games, args.time, args.max_depth)
+    try:
+        if args.socket:
+            asyncio.run(serve_socket(server, args.socket))
+        else:
+            asyncio.run(serve_stdio(server))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+
+if __name__ == "__main__":
+    main()
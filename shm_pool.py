@@ -0,0 +1,179 @@
+"""Process pool that passes search work through shared memory.
+
+ProcessPoolExecutor.map pickles every (BoardState, depth, alpha, beta,
+is_maximizing, player_color) tuple, 64 nested ints each, and unpickles every
+result. ShmPool packs those tuples into slots of a
+multiprocessing.shared_memory ring buffer instead. Workers read their slots
+and write the scores back in place, so only (first slot, count) pairs cross
+the pipe.
+
+ShmPool is a drop-in Executor for main4.search_root. map() of
+main4.look_ahead_worker takes the shared memory path, and anything else goes
+to the wrapped pool as usual:
+
+    with ShmPool(workers=8) as pool:
+        best_move, score = main4.search_root(board, 1, executor=pool)
+
+    python shm_pool.py --positions 20000 --depth 0    # pickle vs shared memory
+"""
+import argparse
+import multiprocessing as mp
+import random
+import struct
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from typing import Iterable, List, Optional, Tuple
+
+import bitboard
+import main4
+
+# black, white, alpha, beta, depth, is_maximizing, player_color, padding, score
+SLOT = struct.Struct('<QQddbbbxd')
+
+# The worker's view of the parent's buffer, attached once by the pool initializer
+_shm: Optional[SharedMemory] = None
+
+
+def _attach(name: str) -> None:
+    global _shm
+    _shm = SharedMemory(name=name)
+
+
+def _run_slots(start: int, count: int) -> int:
+    buffer = _shm.buf
+    for index in range(start, start + count):
+        black, white, alpha, beta, depth, is_maximizing, player_color, _ = \
+            SLOT.unpack_from(buffer, index * SLOT.size)
+        board_state = main4.BoardState.from_list(bitboard.from_bitboards(black, white))
+        score = main4.look_ahead_worker((board_state, depth, alpha, beta,
+                                         bool(is_maximizing), player_color))
+        SLOT.pack_into(buffer, index * SLOT.size, black, white, alpha, beta, depth,
+                       is_maximizing, player_color, score)
+    return count
+
+
+class ShmPool(Executor):
+    def __init__(self, workers: int = mp.cpu_count(), slots: int = 4096):
+        self.slots = slots
+        self._max_workers = workers
+        self.shm = SharedMemory(create=True, size=slots * SLOT.size)
+        self.executor = ProcessPoolExecutor(max_workers=workers, initializer=_attach,
+                                            initargs=(self.shm.name,))
+        # Ring buffer state: the next free slot and the slot ranges still in use
+        self._head = 0
+        self._in_use: List[Tuple[int, int]] = []
+        self._changed = threading.Condition()
+
+    def submit(self, fn, *args, **kwargs):
+        return self.executor.submit(fn, *args, **kwargs)
+
+    def map(self, fn, *iterables, timeout=None, chunksize=1):
+        if fn is not main4.look_ahead_worker or len(iterables) != 1:
+            return self.executor.map(fn, *iterables, timeout=timeout, chunksize=chunksize)
+        return iter(self.map_scores(iterables[0]))
+
+    def map_scores(self, move_args: Iterable[tuple]) -> List[float]:
+        """look_ahead_worker over every argument tuple, in order."""
+        move_args = list(move_args)
+        scores: List[float] = []
+        # Leave room in the ring for other threads' batches
+        window = max(1, self.slots // 2)
+        for offset in range(0, len(move_args), window):
+            scores.extend(self._run_batch(move_args[offset:offset + window]))
+        return scores
+
+    def _run_batch(self, move_args: List[tuple]) -> List[float]:
+        count = len(move_args)
+        start = self._allocate(count)
+        try:
+            buffer = self.shm.buf
+            for index, (board_state, depth, alpha, beta, is_maximizing, player_color) in \
+                    enumerate(move_args, start):
+                black, white = bitboard.to_bitboards(board_state.board)
+                SLOT.pack_into(buffer, index * SLOT.size, black, white, alpha, beta, depth,
+                               is_maximizing, player_color, 0.0)
+            # A few chunks per worker evens out positions that take longer than others
+            chunk = max(1, -(-count // (self._max_workers * 4)))
+            futures = [self.executor.submit(_run_slots, first, min(chunk, start + count - first))
+                       for first in range(start, start + count, chunk)]
+            for future in futures:
+                future.result()
+            scores = [SLOT.unpack_from(buffer, index * SLOT.size)[-1]
+                      for index in range(start, start + count)]
+            # Scores are stored as doubles, hand back ints like look_ahead_worker does
+            return [int(score) if score.is_integer() else score for score in scores]
+        finally:
+            self._free(start, count)
+
+    def _allocate(self, count: int) -> int:
+        with self._changed:
+            while True:
+                start = self._head if self._head + count <= self.slots else 0
+                if not any(start < used_start + used_count and used_start < start + count
+                           for used_start, used_count in self._in_use):
+                    break
+                self._changed.wait()
+            self._in_use.append((start, count))
+            self._head = start + count
+            return start
+
+    def _free(self, start: int, count: int) -> None:
+        with self._changed:
+            self._in_use.remove((start, count))
+            self._changed.notify_all()
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False) -> None:
+        self.executor.shutdown(wait=wait, cancel_futures=cancel_futures)
+        self.shm.close()
+        self.shm.unlink()
+
+
+def random_positions(count: int, depth: int, seed: int = 0) -> List[tuple]:
+    """look_ahead_worker arguments for positions reached by random play."""
+    rng = random.Random(seed)
+    move_args = []
+    while len(move_args) < count:
+        board, color = main4.create_board(), 1
+        for _ in range(rng.randrange(4, 40)):
+            moves = sorted(main4.get_valid_moves(main4.BoardState.from_list(board), color))
+            if not moves:
+                break
+            row, col = rng.choice(moves)
+            board = main4.make_move(board, row, col, color)
+            color = -color
+        move_args.append((main4.BoardState.from_list(board), depth, float('-inf'), float('inf'),
+                          True, color))
+    return move_args
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare pickled and shared memory worker IPC")
+    parser.add_argument('--positions', type=int, default=20000)
+    parser.add_argument('--depth', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=mp.cpu_count())
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    move_args = random_positions(args.positions, args.depth, args.seed)
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        # Same chunking as ShmPool so only the transport differs
+        chunksize = max(1, -(-len(move_args) // (args.workers * 4)))
+        start = time.perf_counter()
+        expected = list(executor.map(main4.look_ahead_worker, move_args, chunksize=chunksize))
+        pickled = time.perf_counter() - start
+    with ShmPool(args.workers) as pool:
+        pool.map_scores(move_args[:args.workers])  # start the workers outside the timing
+        start = time.perf_counter()
+        scores = pool.map_scores(move_args)
+        shared = time.perf_counter() - start
+    print(f"{len(move_args)} positions at depth {args.depth}, {args.workers} workers")
+    print(f"pickle         {pickled:8.3f}s  {len(move_args) / pickled:10.0f} positions/s")
+    print(f"shared memory  {shared:8.3f}s  {len(move_args) / shared:10.0f} positions/s")
+    if scores != expected:
+        raise SystemExit("shared memory scores differ from the pickled ones")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""Disk-backed store of searched positions shared by every game and process.
+
+GameCache and the workers' lru caches start empty every game and every move,
+so tournaments keep re-solving the same endgames. A SolvedStore is a fixed
+size open-addressing hash table in a memory-mapped file. It is keyed by the
+canonical image of (side to move, opponent) under the board's eight
+symmetries, and holds the search depth, bound, score and best move.
+Processes open the same file and read and write it without locks. Every entry
+carries a CRC, so a torn concurrent write reads as a miss.
+
+main4 uses it once OTHELLO_STORE=<path> is set or main4.use_store(path) is
+called. The table never grows: each key has PROBES candidate slots, and a new
+entry replaces the shallowest of them. compact() rewrites the file with only
+the most valuable entries, at a new capacity if asked:
+
+    python solvedstore.py stats store.bin
+    python solvedstore.py compact store.bin --capacity 262144 --min-depth 4
+"""
+import mmap
+import os
+import struct
+import zlib
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+
+import bitboard
+
+MAGIC = b'OTSS'
+VERSION = 1
+# magic, version, entry size, capacity
+HEADER = struct.Struct('<4sHHQ')
+# player, opponent, score, depth, bound, move, padding, crc of the first 20 bytes
+ENTRY = struct.Struct('<QQiBBBxI')
+PROBES = 4
+DEFAULT_CAPACITY = 1 << 20
+
+# Depth of an entry searched to the end of the game, its score the final disc difference
+EXACT_DEPTH = 255
+EXACT, LOWER, UPPER = 0, 1, 2
+NO_MOVE = 255
+
+
+def _mix(x: int) -> int:
+    # splitmix64's finalizer; positions from one game share whole rows, so every bit must count
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & bitboard.FULL
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & bitboard.FULL
+    return x ^ (x >> 31)
+
+
+class Entry(NamedTuple):
+    depth: int
+    bound: int
+    score: int
+    # Square index in the caller's orientation, None when unknown
+    move: Optional[int]
+
+
+class SolvedStore:
+    def __init__(self, path: str, capacity: int = DEFAULT_CAPACITY):
+        self.path = path
+        if not os.path.exists(path):
+            _create(path, capacity)
+        self.file = open(path, 'r+b')
+        self.mm = mmap.mmap(self.file.fileno(), 0)
+        magic, version, entry_size, self.capacity = HEADER.unpack_from(self.mm)
+        if magic != MAGIC or version != VERSION or entry_size != ENTRY.size:
+            raise ValueError(f"{path} is not a version {VERSION} solved-position store")
+        self.pid = os.getpid()
+        self.hits = self.misses = self.writes = 0
+
+    def _slots(self, player: int, opponent: int) -> range:
+        start = _mix(player ^ _mix(opponent)) % self.capacity
+        return range(start, start + PROBES)
+
+    def _read(self, slot: int) -> Optional[Tuple[int, int, int, int, int, int]]:
+        offset = HEADER.size + (slot % self.capacity) * ENTRY.size
+        player, opponent, score, depth, bound, move, crc = ENTRY.unpack_from(self.mm, offset)
+        if player == opponent == 0:
+            return None
+        if zlib.crc32(self.mm[offset:offset + ENTRY.size - 4]) != crc:
+            return None
+        return player, opponent, score, depth, bound, move
+
+    def _write(self, slot: int, player: int, opponent: int, score: int, depth: int,
+               bound: int, move: int) -> None:
+        offset = HEADER.size + (slot % self.capacity) * ENTRY.size
+        data = bytearray(ENTRY.pack(player, opponent, score, depth, bound, move, 0))
+        struct.pack_into('<I', data, ENTRY.size - 4, zlib.crc32(data[:ENTRY.size - 4]))
+        self.mm[offset:offset + ENTRY.size] = data
+
+    def get(self, player: int, opponent: int) -> Optional[Entry]:
+        player, opponent, symmetry = bitboard.canonical(player, opponent)
+        for slot in self._slots(player, opponent):
+            entry = self._read(slot)
+            if entry is not None and entry[0] == player and entry[1] == opponent:
+                self.hits += 1
+                _, _, score, depth, bound, move = entry
+                move = None if move == NO_MOVE else bitboard.SYMMETRY_INVERSE[symmetry][move]
+                return Entry(depth, bound, score, move)
+        self.misses += 1
+        return None
+
+    def put(self, player: int, opponent: int, depth: int, bound: int, score: int,
+            move: Optional[int] = None) -> None:
+        player, opponent, symmetry = bitboard.canonical(player, opponent)
+        move = NO_MOVE if move is None else bitboard.SYMMETRY_SQUARES[symmetry][move]
+        victim, victim_rank = None, None
+        for slot in self._slots(player, opponent):
+            entry = self._read(slot)
+            if entry is None:
+                victim, victim_rank = slot, (-1, -1)
+                break
+            if entry[0] == player and entry[1] == opponent:
+                # Keep a deeper result, or an exact one over a bound at the same depth
+                if (entry[3], entry[4] == EXACT) > (depth, bound == EXACT):
+                    return
+                if move == NO_MOVE and entry[3] == depth:
+                    move = entry[5]
+                victim = slot
+                break
+            rank = (entry[3], entry[4] == EXACT)
+            if victim_rank is None or rank < victim_rank:
+                victim, victim_rank = slot, rank
+        self._write(victim, player, opponent, score, depth, bound, move)
+        self.writes += 1
+
+    def entries(self) -> Iterator[Tuple[int, int, int, int, int, int]]:
+        """Every readable (player, opponent, score, depth, bound, move), canonical."""
+        for slot in range(self.capacity):
+            entry = self._read(slot)
+            if entry is not None:
+                yield entry
+
+    def close(self) -> None:
+        self.mm.close()
+        self.file.close()
+
+    def __enter__(self) -> 'SolvedStore':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def _create(path: str, capacity: int, entries: List[tuple] = ()) -> None:
+    # Built under a temporary name so other processes never see a half-written table
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, ENTRY.size, capacity))
+        f.truncate(HEADER.size + capacity * ENTRY.size)
+    if entries:
+        with SolvedStore(tmp_path) as store:
+            for player, opponent, score, depth, bound, move in entries:
+                # Already canonical, so the symmetry found is the identity
+                store.put(player, opponent, depth, bound, score, None if move == NO_MOVE else move)
+    os.replace(tmp_path, path)
+
+
+def compact(path: str, capacity: Optional[int] = None, min_depth: int = 0) -> Tuple[int, int]:
+    """Rewrites the store keeping its most valuable entries; returns (kept, dropped).
+
+    Run it while no search has the store open.
+    """
+    with SolvedStore(path) as store:
+        capacity = capacity or store.capacity
+        entries = list(store.entries())
+    kept = [entry for entry in entries if entry[3] >= min_depth]
+    # Deepest and exact first, and at most half full so probe windows rarely collide
+    kept.sort(key=lambda entry: (entry[3], entry[4] == EXACT), reverse=True)
+    kept = kept[:capacity // 2]
+    # Insert the least valuable first so a full probe window evicts those, not the deep ones
+    _create(path, capacity, kept[::-1])
+    return len(kept), len(entries) - len(kept)
+
+
+def main() -> None:
+    import argparse
+    parser = argparse.ArgumentParser(description="Inspect or compact a solved-position store")
+    parser.add_argument('command', choices=('stats', 'compact'))
+    parser.add_argument('path')
+    parser.add_argument('--capacity', type=int, help="entries in the compacted table")
+    parser.add_argument('--min-depth', type=int, default=0, help="drop shallower entries")
+    args = parser.parse_args()
+
+    if args.command == 'compact':
+        kept, dropped = compact(args.path, args.capacity, args.min_depth)
+        print(f"kept {kept}, dropped {dropped}")
+        return
+    with SolvedStore(args.path) as store:
+        entries = list(store.entries())
+        exact = sum(1 for entry in entries if entry[3] == EXACT_DEPTH)
+        print(f"{len(entries)}/{store.capacity} slots used ({len(entries) / store.capacity:.1%}), "
+              f"{exact} solved to the end, {os.path.getsize(args.path)} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Startup cost of the engine: imports, lookup tables, first move and pool workers.
+
+Every number comes from fresh interpreters, since a warm one has everything
+imported already:
+
+- import: seconds to import each module, and the whole process's wall time;
+- tables: mapping the cached tables file against building them from scratch;
+- first move: launching python until main4 has returned its first move;
+- spawned worker: starting a spawn-method pool worker (which re-imports
+  main4, as on Windows and macOS) until it has scored one position.
+
+    python startup.py --runs 10 --depth 2
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+_IMPORT = """
+import time
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start)
+"""
+
+_TABLES = """
+import time, tables
+start = time.perf_counter()
+tables._map(tables.PATH)
+mapped = time.perf_counter() - start
+start = time.perf_counter()
+tables._build()
+print(mapped, time.perf_counter() - start)
+"""
+
+_FIRST_MOVE = """
+import main4
+main4.search_root(main4.create_board(), 1, search_depth={depth})
+"""
+
+_SPAWNED_WORKER = """
+import multiprocessing, time
+from concurrent.futures import ProcessPoolExecutor
+import main4
+if __name__ == '__main__':
+    args = (main4.BoardState.from_list(main4.create_board()), 0, float('-inf'), float('inf'), True, 1)
+    start = time.perf_counter()
+    with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context('spawn')) as pool:
+        pool.submit(main4.look_ahead_worker, args).result()
+        print(time.perf_counter() - start)
+"""
+
+
+def _run(code: str) -> List[float]:
+    """Runs code in a fresh interpreter; its printed numbers, then the process's wall time."""
+    start = time.perf_counter()
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+    wall = time.perf_counter() - start
+    return [float(value) for value in output.split()] + [wall]
+
+
+def measure(runs: int, depth: int, modules: List[str]) -> Dict[str, float]:
+    samples: Dict[str, List[float]] = {}
+
+    def add(name: str, value: float) -> None:
+        samples.setdefault(name, []).append(value)
+
+    _run(_TABLES)  # make sure the cache file exists before timing anything
+    for _ in range(runs):
+        for module in modules:
+            seconds, wall = _run(_IMPORT.format(module=module))
+            add(f"import {module}", seconds)
+            add(f"python -c 'import {module}'", wall)
+        mapped, built, _ = _run(_TABLES)
+        add("tables from cache", mapped)
+        add("tables built", built)
+        add(f"first move, depth {depth}", _run(_FIRST_MOVE.format(depth=depth))[-1])
+        add("spawned worker, first result", _run(_SPAWNED_WORKER)[0])
+    return {name: statistics.median(values) for name, values in samples.items()}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure cold start and time to first move")
+    parser.add_argument('--runs', type=int, default=5, help="fresh processes per measurement")
+    parser.add_argument('--depth', type=int, default=2, help="search depth of the first move")
+    parser.add_argument('--module', action='append', help="modules to time importing, "
+                        "default bitboard, engines and main4")
+    args = parser.parse_args()
+
+    results = measure(args.runs, args.depth, args.module or ['bitboard', 'engines', 'main4'])
+    print(f"median of {args.runs} runs")
+    for name, seconds in results.items():
+        print(f"{name:<32} {seconds * 1000:9.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
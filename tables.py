@@ -0,0 +1,153 @@
+"""Precomputed lookup tables, memory-mapped from a versioned cache file.
+
+Every process that imports bitboard, pool workers included, would otherwise
+rebuild the symmetry, line and ray tables. The first process to need them
+writes them to `data/tables.bin` (or $OTHELLO_TABLES), and every later one maps
+that file and reads the tables straight out of it. A file written by a
+different VERSION, or one that is truncated, is rebuilt. When the directory
+is read-only the tables are simply built in memory.
+
+Tables are flat sequences of unsigned 64-bit ints:
+
+    tables.get('rays')[square * 8 + direction]
+
+Bump VERSION whenever a builder changes what it produces.
+"""
+import mmap
+import os
+import struct
+from typing import Callable, Dict, List, Optional, Sequence
+
+MAGIC = b'OTTB'
+VERSION = 1
+# magic, version, table count
+HEADER = struct.Struct('<4sHH')
+# name, first value, value count
+INDEX = struct.Struct('<16sII')
+VALUE = struct.Struct('<Q')
+
+PATH = os.environ.get('OTHELLO_TABLES') or os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                        'data', 'tables.bin')
+
+# Same order as bitboard.SHIFTS: east, west, south, north, then the diagonals
+DIRECTIONS = ((0, 1), (0, -1), (1, 0), (-1, 0), (1, 1), (1, -1), (-1, 1), (-1, -1))
+
+
+def _bit(row: int, col: int) -> int:
+    return 1 << (row * 8 + col)
+
+
+def _walk(row: int, col: int, d_row: int, d_col: int) -> int:
+    mask = 0
+    row, col = row + d_row, col + d_col
+    while 0 <= row < 8 and 0 <= col < 8:
+        mask |= _bit(row, col)
+        row, col = row + d_row, col + d_col
+    return mask
+
+
+def _rays() -> List[int]:
+    # Squares beyond each square in each direction, not including it
+    return [_walk(square // 8, square % 8, d_row, d_col)
+            for square in range(64) for d_row, d_col in DIRECTIONS]
+
+
+def _lines() -> List[int]:
+    # Rows, columns, then the down-right and down-left diagonals, each from its first square
+    lines = []
+    for d_row, d_col in ((0, 1), (1, 0), (1, 1), (1, -1)):
+        for row in range(8):
+            for col in range(8):
+                if not (0 <= row - d_row < 8 and 0 <= col - d_col < 8):
+                    lines.append(_bit(row, col) | _walk(row, col, d_row, d_col))
+    return lines
+
+
+def _symmetry_squares() -> List[int]:
+    # Where square (row, col) goes under each of bitboard.SYMMETRIES, identity first
+    images = []
+    for index in range(8):
+        for square in range(64):
+            row, col = divmod(square, 8)
+            if index & 1:
+                row = 7 - row
+            if index & 2:
+                col = 7 - col
+            if index & 4:
+                row, col = col, row
+            images.append(row * 8 + col)
+    return images
+
+
+BUILDERS: Dict[str, Callable[[], List[int]]] = {
+    'rays': _rays,
+    'lines': _lines,
+    'symmetry_squares': _symmetry_squares,
+}
+
+_tables: Optional[Dict[str, Sequence[int]]] = None
+
+
+def _build() -> Dict[str, List[int]]:
+    return {name: builder() for name, builder in BUILDERS.items()}
+
+
+def _write(path: str, tables: Dict[str, List[int]]) -> None:
+    data = bytearray(HEADER.pack(MAGIC, VERSION, len(tables)))
+    first = 0
+    for name, values in tables.items():
+        data += INDEX.pack(name.encode(), first, len(values))
+        first += len(values)
+    for values in tables.values():
+        data += struct.pack(f'<{len(values)}Q', *values)
+    # Written under a temporary name so no process maps a half-written file
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _map(path: str) -> Optional[Dict[str, Sequence[int]]]:
+    try:
+        with open(path, 'rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    if len(mm) < HEADER.size:
+        return None
+    magic, version, count = HEADER.unpack_from(mm)
+    if magic != MAGIC or version != VERSION:
+        return None
+    start = HEADER.size + count * INDEX.size
+    values = memoryview(mm)[start:]
+    if len(values) % VALUE.size:
+        return None
+    values = values.cast('Q')
+    tables = {}
+    for position in range(count):
+        name, first, length = INDEX.unpack_from(mm, HEADER.size + position * INDEX.size)
+        if first + length > len(values):
+            return None
+        tables[name.rstrip(b'\0').decode()] = values[first:first + length]
+    if set(tables) != set(BUILDERS):
+        return None
+    return tables
+
+
+def load(path: str = PATH) -> Dict[str, Sequence[int]]:
+    """Every table, mapped from the cache file when it is current."""
+    global _tables
+    if _tables is None:
+        _tables = _map(path)
+    if _tables is None:
+        built = _build()
+        try:
+            _write(path, built)
+        except OSError:
+            pass
+        _tables = _map(path) or built
+    return _tables
+
+
+def get(name: str) -> Sequence[int]:
+    return load()[name]
@@ -0,0 +1,184 @@
+"""Game-clock time management for main4.
+
+move() searches a fixed depth whatever the clock says, so under a total-game
+clock it either flags or leaves time unused. TimeManager instead splits what
+is left of a player's main4.Clock over the moves still to play:
+
+- opening moves get less, the midgame (20-44 empties) more;
+- a share of the clock is held back for the exact solve from `solve_empties`
+  empties on;
+- the target grows when the best move changes between iterations, and the
+  search stops early once one move is far ahead of the rest.
+
+TimedBot deepens one ply at a time within that budget on a Scheduler pool.
+A hard deadline cuts off an iteration that overruns.
+
+    clocks = {1: main4.Clock(60), -1: main4.Clock(60)}
+    with TimedBot(clocks[1]) as bot:
+        main4.play_game(bot, main4.move, clocks=clocks)
+
+    python timeman.py --time 60        # TimedBot against fixed-depth main4
+"""
+import argparse
+import multiprocessing as mp
+import time
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import main4
+from scheduler import Result, Scheduler
+
+Move = Optional[Tuple[int, int]]
+
+
+@dataclass
+class Budget:
+    # No new iteration starts after target seconds, and none runs past maximum
+    target: float
+    maximum: float
+
+
+@dataclass
+class TimeManager:
+    solve_empties: int = 10
+    # What the exact endgame is worth in midgame moves' time, kept back until it starts
+    solve_weight: float = 6.0
+    # Seconds per remaining move kept back for process and protocol overhead
+    safety: float = 0.02
+    max_ratio: float = 3.0
+    # Target growth when an iteration changes the best move
+    extend: float = 1.5
+    # Score lead over the second best move that ends the search early
+    dominance: float = 200.0
+    dominance_depth: int = 4
+
+    def weight(self, empties: int) -> float:
+        if empties > 44:
+            return 0.5
+        if empties > 20:
+            return 1.5
+        return 1.0
+
+    def allocate(self, empties: int, clock: main4.Clock) -> Budget:
+        our_moves = max(1, (empties + 1) // 2)
+        available = clock.remaining + clock.increment * (our_moves - 1) - self.safety * our_moves
+        available = max(0.0, min(available, clock.remaining - self.safety))
+        if empties <= self.solve_empties:
+            # Later moves re-solve far smaller trees, so the first solve may use most of it
+            target = available * 0.5
+            return Budget(target, min(target * self.max_ratio, available * 0.8))
+        weights = [self.weight(left) for left in range(empties, self.solve_empties, -2)]
+        total = sum(weights) + self.solve_weight
+        target = available * weights[0] / total
+        midgame = available * (total - self.solve_weight) / total
+        return Budget(target, max(target, min(target * self.max_ratio, midgame * 0.5)))
+
+    def dominates(self, result: Result) -> bool:
+        if result.depth < self.dominance_depth or len(result.scores) < 2:
+            return False
+        best, second = sorted(result.scores.values(), reverse=True)[:2]
+        return best - second >= self.dominance
+
+
+class TimedBot:
+    """main4 under a game clock; call it like any play_game bot."""
+
+    def __init__(self, clock: main4.Clock, manager: Optional[TimeManager] = None,
+                 workers: Optional[int] = None, max_depth: int = 20):
+        self.clock = clock
+        self.manager = manager or TimeManager()
+        self.max_depth = max_depth
+        self.scheduler = Scheduler(workers or mp.cpu_count())
+        # One entry per move: empties, budget, time used, depth and why the search stopped
+        self.log: List[dict] = []
+
+    def __call__(self, board_state: List[List[int]], player_color: int) -> Move:
+        start = time.monotonic()
+        empties = sum(row.count(0) for row in board_state)
+        moves = sorted(main4.get_valid_moves(main4.BoardState.from_list(board_state), player_color))
+        if len(moves) <= 1:
+            return moves[0] if moves else None
+
+        budget = self.manager.allocate(empties, self.clock)
+        deadline = start + budget.maximum
+        target = budget.target
+        solving = empties <= self.manager.solve_empties
+        # The heuristic search is only a fallback when an exact solve is coming
+        max_depth = min(self.max_depth, empties - 1, 4 if solving else self.max_depth)
+        best: Optional[Result] = None
+        reason = 'depth'
+        times: List[float] = []
+        for depth in range(1, max_depth + 1):
+            elapsed = time.monotonic() - start
+            growth = min(8.0, max(2.0, times[-1] / times[-2])) if len(times) > 1 and times[-2] else 4.0
+            if best is not None and elapsed >= target:
+                reason = 'target'
+                break
+            if best is not None and times and elapsed + times[-1] * growth > budget.maximum:
+                reason = 'predicted'
+                break
+            iteration_start = time.monotonic()
+            result = self.scheduler.submit(self, board_state, player_color, depth,
+                                           deadline=deadline).result()
+            times.append(time.monotonic() - iteration_start)
+            if not result.complete:
+                best = best or result
+                reason = 'deadline'
+                break
+            if best is not None and result.move != best.move:
+                target = min(budget.maximum, target * self.manager.extend)
+            best = result
+            if self.manager.dominates(result):
+                reason = 'dominant'
+                break
+
+        if solving and time.monotonic() < deadline:
+            result = self.scheduler.submit(self, board_state, player_color, deadline=deadline).result()
+            # A partly finished solve still proves a win when it found one
+            if result.complete or (result.score is not None and result.score > 0):
+                best = result
+                reason = 'solved' if result.complete else 'solved win'
+            else:
+                reason = 'solve timeout'
+
+        self.log.append({'empties': empties, 'target': round(budget.target, 3),
+                         'maximum': round(budget.maximum, 3),
+                         'used': round(time.monotonic() - start, 3), 'depth': best.depth,
+                         'reason': reason, 'remaining': round(self.clock.remaining, 3)})
+        return best.move
+
+    def close(self) -> None:
+        self.scheduler.close()
+
+    def __enter__(self) -> 'TimedBot':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Play TimedBot against fixed-depth main4 under a clock")
+    parser.add_argument('--time', type=float, default=60.0, help="seconds per player for the game")
+    parser.add_argument('--increment', type=float, default=0.0)
+    parser.add_argument('--opponent-time', type=float, help="main4's clock, defaults to --time")
+    parser.add_argument('--workers', type=int, default=mp.cpu_count())
+    parser.add_argument('--white', action='store_true', help="TimedBot plays white")
+    args = parser.parse_args()
+
+    color = -1 if args.white else 1
+    opponent_time = args.time if args.opponent_time is None else args.opponent_time
+    clocks = {color: main4.Clock(args.time, args.increment),
+              -color: main4.Clock(opponent_time, args.increment)}
+    with TimedBot(clocks[color], workers=args.workers) as bot:
+        bots = (bot, main4.move) if color == 1 else (main4.move, bot)
+        black, white = main4.play_game(*bots, verbose=False, clocks=clocks)
+    for entry in bot.log:
+        print(f"{entry['empties']:>3} empties  target {entry['target']:>7.2f}s  max {entry['maximum']:>7.2f}s"
+              f"  used {entry['used']:>7.2f}s  depth {entry['depth']:>2}  {entry['reason']}")
+    print(f"Black {black} - White {white}; clock left: TimedBot {clocks[color].remaining:.2f}s, "
+          f"main4 {clocks[-color].remaining:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
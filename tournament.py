@@ -0,0 +1,321 @@
+"""Headless tournament runner.
+
+Plays every pair of engines from a set of openings, both colours each, over
+a process pool. Finished games are appended to a JSON lines file as they
+come in, so an interrupted run can be resumed, and the report gives Elo with
+95% error bars for every engine and pairing.
+
+    python tournament.py -e main4 -e main -e edax:3 --openings 50 -o games.jsonl
+
+Engine specs are anything engines.create() accepts (e.g.
+`alphabeta:movegen=bitboard,evaluator=disc,depth=4`), `module:function`, or
+`edax:LEVEL` for an Edax process started in each worker.
+"""
+import argparse
+import importlib
+import itertools
+import json
+import math
+import os
+import random
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from multiprocessing.util import Finalize
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import edax
+import engines
+import main4
+from gamerecord import GameRecord, GameWriter
+
+# Engines are built once per worker process and reused across games
+_engines: Dict[str, Callable] = {}
+_edax_processes = []
+
+
+class TimedBot:
+    def __init__(self, bot: Callable, history: List[Optional[Tuple[int, int]]]):
+        self.bot = bot
+        # Shared by both players, so it ends up as the game's move list
+        self.history = history
+        self.elapsed = 0.0
+        self.moves = 0
+
+    def __call__(self, board: List[List[int]], player_color: int) -> Optional[Tuple[int, int]]:
+        start = time.perf_counter()
+        result = self.bot(board, player_color)
+        self.elapsed += time.perf_counter() - start
+        self.moves += 1
+        self.history.append(result)
+        return result
+
+
+def load_engine(spec: str, edax_path: str = "./edax") -> Callable:
+    if spec in _engines:
+        return _engines[spec]
+    options = spec.partition(':')[2]
+
+    if spec.startswith('edax:'):
+        level = int(spec.split(':')[1])
+        process = edax.start_edax(edax_path, level=level)
+        _edax_processes.append(process)
+
+        def bot(board, player_color):
+            return edax.search(process, board, player_color).bot_move
+    # Registry specs take key=value options, so `main4:move` is still module:function
+    elif engines.is_registered(spec) and all('=' in option for option in filter(None, options.split(','))):
+        bot = engines.as_bot(engines.create(spec))
+    else:
+        module_name, _, function_name = spec.partition(':')
+        bot = getattr(importlib.import_module(module_name), function_name or 'move')
+
+    _engines[spec] = bot
+    return bot
+
+
+def random_openings(count: int, plies: int, seed: int) -> List[Tuple[str, int]]:
+    rng = random.Random(seed)
+    openings = []
+    seen = set()
+    attempts = 0
+    while len(openings) < count:
+        attempts += 1
+        board, color = main4.create_board(), 1
+        for _ in range(plies):
+            moves = sorted(main4.get_valid_moves(main4.BoardState.from_list(board), color))
+            if not moves:
+                break
+            row, col = rng.choice(moves)
+            board = main4.make_move(board, row, col, color)
+            color = -color
+        fen = edax.arr_to_fen(board)
+        # Very short openings have few distinct positions, don't loop forever
+        if (fen, color) in seen and attempts < count * 20:
+            continue
+        seen.add((fen, color))
+        openings.append((fen, color))
+    return openings
+
+
+def load_openings(path: str) -> List[Tuple[str, int]]:
+    # One "fen X|O" per line, in edax.arr_to_fen's format
+    openings = []
+    with open(path) as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and not line.startswith('#'):
+                openings.append((parts[0], 1 if parts[1].upper() in ('X', 'B') else -1))
+    return openings
+
+
+@dataclass(frozen=True)
+class GameTask:
+    game_id: str
+    black: str
+    white: str
+    opening: int
+    fen: str
+    color: int
+    edax_path: str
+
+
+def schedule(engines: List[str], openings: List[Tuple[str, int]],
+             rounds: int, edax_path: str) -> Iterator[GameTask]:
+    for round_number in range(rounds):
+        for index, (fen, color) in enumerate(openings):
+            for first, second in itertools.combinations(engines, 2):
+                for black, white in ((first, second), (second, first)):
+                    yield GameTask(f"{round_number}-{index}-{black}-{white}",
+                                   black, white, index, fen, color, edax_path)
+
+
+def play_task(task: GameTask) -> dict:
+    history = []
+    black = TimedBot(load_engine(task.black, task.edax_path), history)
+    white = TimedBot(load_engine(task.white, task.edax_path), history)
+    black_count, white_count = main4.play_game(
+        black, white, verbose=False,
+        board=edax.fen_to_arr(task.fen), current_player=task.color)
+    return {
+        'id': task.game_id,
+        'black': task.black,
+        'white': task.white,
+        'opening': task.opening,
+        'black_discs': black_count,
+        'white_discs': white_count,
+        'black_time': round(black.elapsed, 4),
+        'white_time': round(white.elapsed, 4),
+        'black_moves': black.moves,
+        'white_moves': white.moves,
+        'moves': ''.join('PS' if played is None else edax.bot_to_edax(played)
+                         for played in history),
+    }
+
+
+def to_game_record(result: dict, openings: List[Tuple[str, int]]) -> GameRecord:
+    text = result['moves']
+    moves = [None if text[i:i + 2] == 'PS' else edax.edax_to_bot(text[i:i + 2])
+             for i in range(0, len(text), 2)]
+    fen, color = openings[result['opening']]
+    return GameRecord(moves, black=result['black'], white=result['white'],
+                      result=result['black_discs'] - result['white_discs'],
+                      fen=fen, turn=color, extra={'id': result['id']})
+
+
+def _close_engines() -> None:
+    for process in _edax_processes:
+        edax.close_edax(process)
+    # Engines from the registry, mcts's worker pool among them
+    for bot in _engines.values():
+        if hasattr(bot, 'close'):
+            bot.close()
+
+
+def _init_worker(store: Optional[str] = None) -> None:
+    # Pool workers leave through multiprocessing's exit path, not atexit. Ahead of the
+    # queues' own finalizers (priority 10), which an engine's pool needs to shut down
+    Finalize(None, _close_engines, exitpriority=20)
+    # Games already fill every CPU, a pool per game on top would make workers squared processes
+    main4.ROOT_WORKERS = 1
+    # Spawned workers start from a fresh main4, so each opens the store itself
+    if store:
+        main4.use_store(store)
+
+
+def read_results(path: str) -> List[dict]:
+    results = []
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                try:
+                    results.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # A torn last line from an interrupted run
+                    continue
+    return results
+
+
+def run(tasks: List[GameTask], output: str, workers: int,
+        openings: List[Tuple[str, int]], records: Optional[str] = None,
+        store: Optional[str] = None) -> None:
+    done = {result['id'] for result in read_results(output)}
+    pending = [task for task in tasks if task.game_id not in done]
+    print(f"{len(done)} games already played, {len(pending)} to go")
+
+    if store:
+        # Created here once, ahead of the workers that all open it
+        main4.use_store(store)
+    writer = GameWriter(records) if records else None
+    with open(output, 'a') as out, \
+            ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                initargs=(store,)) as executor:
+        futures = {executor.submit(play_task, task): task for task in pending}
+        failed = 0
+        for finished, future in enumerate(as_completed(futures), 1):
+            try:
+                result = future.result()
+            except Exception as exc:
+                # Left out of the output, so a resumed run plays it again
+                failed += 1
+                print(f"game {futures[future].game_id} failed: {type(exc).__name__}: {exc}")
+                continue
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+            if writer:
+                writer.write(to_game_record(result, openings))
+                writer.flush()
+            if finished % 100 == 0:
+                print(f"{finished}/{len(pending)} games")
+    if writer:
+        writer.close()
+    if failed:
+        print(f"{failed} games failed and will be replayed on the next run")
+
+
+def game_score(result: dict, engine: str) -> float:
+    diff = result['black_discs'] - result['white_discs']
+    if result['white'] == engine:
+        diff = -diff
+    return 1.0 if diff > 0 else 0.5 if diff == 0 else 0.0
+
+
+def elo(score: float) -> float:
+    score = min(max(score, 1e-4), 1 - 1e-4)
+    return -400 * math.log10(1 / score - 1)
+
+
+def elo_with_error(scores: List[float]) -> Tuple[float, float, float]:
+    """Returns (elo, lower, upper) for a list of per-game scores, 95% interval."""
+    n = len(scores)
+    mean = sum(scores) / n
+    variance = sum((s - mean) ** 2 for s in scores) / max(n - 1, 1)
+    margin = 1.96 * math.sqrt(variance / n)
+    return elo(mean), elo(mean - margin), elo(mean + margin)
+
+
+def report(results: List[dict]) -> str:
+    per_engine = defaultdict(list)
+    per_pair = defaultdict(list)
+    think_time = defaultdict(float)
+    moves = defaultdict(int)
+    for result in results:
+        for engine in (result['black'], result['white']):
+            per_engine[engine].append(game_score(result, engine))
+        first, second = sorted((result['black'], result['white']))
+        per_pair[(first, second)].append(game_score(result, first))
+        for side in ('black', 'white'):
+            think_time[result[side]] += result[f'{side}_time']
+            moves[result[side]] += result[f'{side}_moves']
+
+    lines = [f"{len(results)} games", "",
+             f"{'engine':<16}{'games':>7}{'score':>8}{'elo':>8}{'95% interval':>18}{'ms/move':>10}"]
+    ranked = sorted(per_engine.items(), key=lambda item: -sum(item[1]) / len(item[1]))
+    for engine, scores in ranked:
+        rating, lower, upper = elo_with_error(scores)
+        ms = 1000 * think_time[engine] / max(moves[engine], 1)
+        lines.append(f"{engine:<16}{len(scores):>7}{sum(scores) / len(scores):>8.3f}"
+                     f"{rating:>+8.0f}{f'[{lower:+.0f}, {upper:+.0f}]':>18}{ms:>10.1f}")
+
+    lines += ["", f"{'pairing':<34}{'games':>7}{'elo':>8}{'95% interval':>18}"]
+    for (first, second), scores in sorted(per_pair.items()):
+        rating, lower, upper = elo_with_error(scores)
+        lines.append(f"{first + ' vs ' + second:<34}{len(scores):>7}"
+                     f"{rating:>+8.0f}{f'[{lower:+.0f}, {upper:+.0f}]':>18}")
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Parallel engine tournament with Elo report")
+    parser.add_argument('-e', '--engine', action='append', default=[],
+                        help="engine spec, repeat for each participant")
+    parser.add_argument('-o', '--output', default='tournament.jsonl')
+    parser.add_argument('--openings', default='20',
+                        help="number of random openings, or a file of 'fen X|O' lines")
+    parser.add_argument('--plies', type=int, default=6, help="random opening length")
+    parser.add_argument('--rounds', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--edax-path', default='./edax')
+    parser.add_argument('--records', help="also append every game to this game record file")
+    parser.add_argument('--store', help="solved-position store shared by every game (see solvedstore.py)")
+    parser.add_argument('--report', action='store_true',
+                        help="only print the report for an existing output file")
+    args = parser.parse_args()
+
+    if not args.report:
+        if len(args.engine) < 2:
+            parser.error("need at least two engines")
+        if os.path.exists(args.openings):
+            openings = load_openings(args.openings)
+        else:
+            openings = random_openings(int(args.openings), args.plies, args.seed)
+        tasks = list(schedule(args.engine, openings, args.rounds, args.edax_path))
+        run(tasks, args.output, args.workers, openings, args.records, args.store)
+
+    print(report(read_results(args.output)))
+
+
+if __name__ == "__main__":
+    main()